@@ -356,6 +356,11 @@ def main() -> None:
     # ✅ 登录前就隐藏内置多页面导航（否则登录页会露出那一堆“奇怪页面”）
     _hide_builtin_pages_nav()
 
+    # ✅ 后台提前载入预编译的 jieba 词典（登录期间完成），首个分词请求不再卡顿
+    from aid_integrated.campus import jieba_dict
+
+    jieba_dict.preload_async()
+
     # ✅ auth 门禁放在 main 里，避免 import 时产生副作用
     from aid_integrated.auth.service import ensure_auth_state, logout_user
     from aid_integrated.auth.ui import render_login_register
@@ -0,0 +1,134 @@
+"""会话级文件存储：小文件留在内存，大文件落盘到临时目录、用到时再读出；session_state 中只保存句柄"""
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+import weakref
+from collections import namedtuple
+
+
+# 超过该大小的上传文件写入临时文件，不再常驻内存
+SPILL_THRESHOLD = int(os.getenv("CAMPUS_BLOB_SPILL_KB", "256")) * 1024
+# 会话闲置超过该秒数后释放其全部文件
+IDLE_TIMEOUT = int(os.getenv("CAMPUS_BLOB_IDLE_SECONDS", "3600"))
+
+BlobInfo = namedtuple("BlobInfo", ["name", "size", "sha256", "spilled"])
+
+_live_stores = weakref.WeakSet()
+_live_lock = threading.Lock()
+
+
+def _remove_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class SessionBlobStore:
+    """单个会话的文件存储；会话对象被回收、闲置超时或手动 close 时删除落盘文件"""
+
+    def __init__(self, spill_threshold=None):
+        self.spill_threshold = SPILL_THRESHOLD if spill_threshold is None else spill_threshold
+        self.closed = False
+        self.last_access = time.monotonic()
+        self._lock = threading.Lock()
+        self._mem = {}
+        self._paths = {}
+        self._info = {}
+        self._by_digest = {}
+        self._dir = None
+        self._finalizer = None
+        with _live_lock:
+            _live_stores.add(self)
+
+    def _spill_dir(self):
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="campus_blobs_")
+            self._finalizer = weakref.finalize(self, _remove_dir, self._dir)
+        return self._dir
+
+    def _check_open(self):
+        if self.closed:
+            raise KeyError("文件存储已释放（会话闲置超时），请重新上传")
+        self.last_access = time.monotonic()
+
+    def put(self, name, data):
+        """存入文件内容，返回句柄；同一会话内相同内容复用同一句柄"""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._check_open()
+            handle = self._by_digest.get(digest)
+            if handle is not None:
+                self._info[handle] = self._info[handle]._replace(name=name)
+                return handle
+            handle = uuid.uuid4().hex
+            spilled = len(data) > self.spill_threshold
+            if spilled:
+                path = os.path.join(self._spill_dir(), handle)
+                with open(path, "wb") as f:
+                    f.write(data)
+                self._paths[handle] = path
+            else:
+                self._mem[handle] = bytes(data)
+            self._info[handle] = BlobInfo(name, len(data), digest, spilled)
+            self._by_digest[digest] = handle
+            return handle
+
+    def info(self, handle):
+        with self._lock:
+            self._check_open()
+            return self._info[handle]
+
+    def read(self, handle):
+        """读出完整内容（落盘文件每次整份读入一份新的 bytes），调用方用完即丢，不要存回 session_state"""
+        with self._lock:
+            self._check_open()
+            data = self._mem.get(handle)
+            if data is not None:
+                return data
+            path = self._paths[handle]
+        with open(path, "rb") as f:
+            return f.read()
+
+    def delete(self, handle):
+        with self._lock:
+            self._mem.pop(handle, None)
+            info = self._info.pop(handle, None)
+            if info is not None:
+                self._by_digest.pop(info.sha256, None)
+            path = self._paths.pop(handle, None)
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for handle in list(self._info):
+            self.delete(handle)
+
+    def close(self):
+        """释放全部内容；之后的读写都会抛 KeyError"""
+        with self._lock:
+            self.closed = True
+            self._mem.clear()
+            self._paths.clear()
+            self._info.clear()
+            self._by_digest.clear()
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+def sweep_idle(timeout=None):
+    """释放闲置超时的会话存储，返回释放的数量"""
+    limit = IDLE_TIMEOUT if timeout is None else timeout
+    now = time.monotonic()
+    with _live_lock:
+        stores = list(_live_stores)
+    released = 0
+    for store in stores:
+        if not store.closed and now - store.last_access > limit:
+            store.close()
+            released += 1
+    return released
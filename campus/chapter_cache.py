@@ -0,0 +1,171 @@
+"""章节级增量计算：按章节内容哈希缓存每个章节的中间结果（句子评分统计、句子词频矩阵、核心句、摘要、
+TF-IDF 词组统计与词流、词云权重）。新增章节或重新清洗后只有内容变化的章节需要重算；
+全局摘要与全局词云由各章节的缓存统计合并得到，结果与对合并文本整体计算一致"""
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse import issparse
+
+from . import summary_utils, wordcloud_utils
+from .packed_text import PackedTexts, concat, pack
+from .text_cleaner import load_custom_stopwords
+from .vocab import Vocabulary, concat_ids
+
+
+# 统计逻辑变化时递增，使进程内缓存的旧结果失效
+CACHE_VERSION = 2
+# 进程内章节中间结果的内存上限（按估算的字节数、最近使用淘汰；超过上限的单条结果不缓存）
+MAX_CACHE_BYTES = int(os.getenv("CAMPUS_CHAPTER_CACHE_MB", "64")) * 1024 * 1024
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def content_digest(content):
+    """章节内容哈希（句子序列或清洗后文本）"""
+    if isinstance(content, PackedTexts):
+        return content.digest()
+    return hashlib.sha256(str(content).encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _nbytes(value):
+    """缓存结果的大致内存占用：数组与稀疏矩阵按数据缓冲区计，容器与对象逐项累加；共享的词表不计入"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if issparse(value):
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if isinstance(value, Vocabulary):
+        return 0
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(k) + _nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(map(_nbytes, value))
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + _nbytes(vars(value))
+    return sys.getsizeof(value)
+
+
+def _cached(kind, content, compute, *params):
+    global _cache_bytes
+    # 停用词表变化（词表文件被修改）时键随之变化
+    key = (kind, content_digest(content), hash(load_custom_stopwords()), CACHE_VERSION) + params
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            return entry[0]
+    value = compute()
+    size = _nbytes(value)
+    if size > MAX_CACHE_BYTES:
+        return value
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_bytes -= old[1]
+        _cache[key] = (value, size)
+        _cache_bytes += size
+        while _cache_bytes > MAX_CACHE_BYTES:
+            _cache_bytes -= _cache.popitem(last=False)[1][1]
+    return value
+
+
+def clear():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def _sentence_stats(sentences):
+    return _cached("sentence_stats", sentences, lambda: summary_utils.sentence_stats(sentences))
+
+
+def _term_counts(sentences):
+    return _cached("term_counts", sentences, lambda: summary_utils.sentence_term_counts(sentences))
+
+
+def _core_sentences(sentences):
+    def compute():
+        stats = _sentence_stats(sentences)
+        return summary_utils.extract_core_sentences(sentences, summary_utils.merged_scores([stats]), stats.english_ratio)
+
+    return _cached("core", sentences, compute)
+
+
+def chapter_summary(sentences, summary_length=100, method="heuristic"):
+    """单个章节的 (摘要, 核心句)，章节内容与参数不变时直接取缓存"""
+    sentences = pack(sentences)
+
+    def compute():
+        if method == "graph":
+            return summary_utils.generate_summary(
+                sentences, summary_length, method=method, term_counts=_term_counts(sentences)[0]
+            )
+        scores = summary_utils.merged_scores([_sentence_stats(sentences)])
+        return summary_utils.generate_summary(sentences, summary_length, method=method, scores=scores)
+
+    summary = _cached("summary", sentences, compute, summary_length, method)
+    return summary, _core_sentences(sentences)
+
+
+def global_summary(chapter_sentences, summary_length=100, method="heuristic"):
+    """全局 (摘要, 核心句)：按章节顺序合并各章节缓存的句子统计计算，只有变化的章节需要重新统计"""
+    parts = [pack(s) for s in chapter_sentences]
+    sentences = concat(parts)
+    if not len(sentences):
+        return summary_utils.generate_summary(sentences, summary_length), []
+    stats = [_sentence_stats(p) for p in parts]
+    scores = summary_utils.merged_scores(stats)
+    term_counts = None
+    if method == "graph":
+        term_counts = summary_utils.stack_term_counts([_term_counts(p) for p in parts])
+    summary = summary_utils.generate_summary(
+        sentences, summary_length, method=method, scores=scores, term_counts=term_counts
+    )
+    english_ratio = np.concatenate([st.english_ratio for st in stats])
+    return summary, summary_utils.extract_core_sentences(sentences, scores, english_ratio)
+
+
+def chapter_wordcloud_weights(chapter_texts, method="TF-IDF", corpus_idf=False):
+    """各章节词云权重 {章节名: 词权重}，跳过空文本章节。单章节权重、章节 n 元词组统计均按章节内容缓存；
+    corpus_idf 时由各章节统计合并计算跨章节 IDF"""
+    texts = {name: text for name, text in chapter_texts.items() if str(text).strip()}
+    if method == "TF-IDF" and corpus_idf:
+        try:
+            stats = {
+                name: _cached("ngram_stats", text, lambda text=text: wordcloud_utils.chapter_ngram_stats(text))
+                for name, text in texts.items()
+            }
+        except Exception as e:
+            print(f"章节词组统计失败：{str(e)}")
+            return {name: {} for name in texts}
+        return wordcloud_utils.corpus_tfidf_from_stats(stats)
+
+    fn = wordcloud_utils.get_tfidf_weights if method == "TF-IDF" else wordcloud_utils.get_textrank_weights
+    return {name: _cached("weights", text, lambda text=text: fn(text), method) for name, text in texts.items()}
+
+
+def global_wordcloud_weights(chapter_texts, method="TF-IDF"):
+    """全局词云权重：按章节顺序拼接各章节缓存的词流后计算，结果与对合并文本调用 get_tfidf_weights /
+    get_textrank_weights 一致"""
+    texts = [text for text in chapter_texts.values() if str(text).strip()]
+    try:
+        if method == "TF-IDF":
+            parts = [_cached("tfidf_ids", text, lambda text=text: wordcloud_utils.tfidf_token_ids(text)) for text in texts]
+            return wordcloud_utils.tfidf_weights_from_ids(*concat_ids(parts))
+        streams = [
+            _cached("textrank_stream", text, lambda text=text: wordcloud_utils.textrank_token_stream(text))
+            for text in texts
+        ]
+        if not streams:
+            return {}
+        ids, vocab = concat_ids((ids, vocab) for ids, _, vocab in streams)
+        return wordcloud_utils.textrank_weights_from_stream(ids, np.concatenate([tags for _, tags, _ in streams]), vocab)
+    except Exception as e:
+        print(f"全局词云权重计算失败：{str(e)}")
+        return {}
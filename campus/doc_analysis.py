@@ -0,0 +1,164 @@
+"""文档分析产物：同一份文本只分词、切句一次，词云、摘要、核心知识点与 TF-IDF 页面共用同一份结果"""
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .packed_text import PackedTexts, pack
+from .tokenize_service import posseg_lcut, tokenize_many
+from .vocab import TAGS, current_vocab
+
+
+# 分析逻辑变化时递增，使进程内缓存的旧产物失效
+ANALYSIS_VERSION = 2
+# 进程内最多缓存的分析产物数量（按最近使用淘汰）
+CACHE_SIZE = 32
+
+_RUN_RE = re.compile(r"([\u4e00-\u9fff]+)|([a-zA-Z]+)|(\d+)")
+_SENTENCE_SPLIT_RE = re.compile(r"[。！？；,.]")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class DocumentAnalysis:
+    """一份文档的分词与切句结果。
+
+    units 为切分单元（清洗文本的标点片段、句子列表中的句子或段落），以 PackedTexts 紧凑存放；
+    token_ids 为整篇词流在词表 vocab（构建时的当前词表）中的 uint32 id，第 i 个单元的词为
+    token_ids[unit_bounds[i]:unit_bounds[i + 1]]。sentences 为可用于摘要的句子，
+    sentence_units[j] 为第 j 句对应的单元下标。以 "posseg" 分词时 tag_ids 为与词流等长的
+    词性 id（词性表 TAGS），否则为 None。
+    """
+
+    def __init__(self, key, units, token_ids, unit_bounds, sentence_units, sentences, vocab, tag_ids=None):
+        self.key = key
+        self.units = units
+        self.token_ids = token_ids
+        self.unit_bounds = unit_bounds
+        self.sentence_units = sentence_units
+        self.sentences = sentences
+        self.vocab = vocab
+        self.tag_ids = tag_ids
+
+    def unit_ids(self, i):
+        return self.token_ids[self.unit_bounds[i]:self.unit_bounds[i + 1]]
+
+    def sentence_token_bounds(self):
+        """各句在 token_ids 中的 [start, end)，形状为 (句数, 2) 的 int64 数组"""
+        idx = np.asarray(self.sentence_units, dtype=np.int64)
+        return np.stack([self.unit_bounds[idx], self.unit_bounds[idx + 1]], axis=1)
+
+
+def _mixed_tokens_with_units(units, tagged=False):
+    """与 text_cleaner.tokenize_mixed 相同的切分规则；单元以换行相隔，词不会跨单元。
+    tagged 为 True 时中文片段用 jieba.posseg 切分，词流元素为 (词, 词性)，英文记为 eng、数字记为 m"""
+    text = "\n".join(units)
+    matches = list(_RUN_RE.finditer(text))
+    cn_runs = [m.group(1) for m in matches if m.group(1)]
+    cn_tokens = iter(tokenize_many(cn_runs, tokenizer=posseg_lcut) if tagged else tokenize_many(cn_runs))
+
+    tokens = []
+    token_starts = []
+    for m in matches:
+        cn_part, en_part, num_part = m.groups()
+        if cn_part:
+            run = next(cn_tokens)
+        elif en_part:
+            run = [(en_part.lower(), "eng") if tagged else en_part.lower()]
+        else:
+            run = [(num_part, "m") if tagged else num_part]
+        tokens.extend(run)
+        token_starts.extend([m.start()] * len(run))
+
+    # 单元 i 以第 offsets[i] 个字符开始（单元间隔一个换行），其词的起点即首个起始位置不小于它的词
+    offsets = np.zeros(len(units), dtype=np.int64)
+    if len(units) > 1:
+        np.cumsum(np.fromiter((len(u) + 1 for u in units[:-1]), dtype=np.int64, count=len(units) - 1), out=offsets[1:])
+    unit_bounds = np.empty(len(units) + 1, dtype=np.int64)
+    unit_bounds[:-1] = np.searchsorted(np.asarray(token_starts, dtype=np.int64), offsets, side="left")
+    unit_bounds[-1] = len(tokens)
+    return tokens, unit_bounds
+
+
+def _runs_with_units(runs):
+    unit_bounds = np.zeros(len(runs) + 1, dtype=np.int64)
+    if runs:
+        np.cumsum(np.fromiter(map(len, runs), dtype=np.int64, count=len(runs)), out=unit_bounds[1:])
+    return [t for run in runs for t in run], unit_bounds
+
+
+def _split_tokens_with_units(units):
+    """按空白切分（已分词文本）"""
+    return _runs_with_units([u.split() for u in units])
+
+
+def _jieba_tokens_with_units(units):
+    return _runs_with_units(tokenize_many(units))
+
+
+def _build(key, units, sentence_units, sentences, tokenizer):
+    tag_ids = None
+    if tokenizer == "jieba":
+        tokens, unit_bounds = _jieba_tokens_with_units(units)
+    elif tokenizer == "whitespace":
+        tokens, unit_bounds = _split_tokens_with_units(units)
+    elif tokenizer == "posseg":
+        pairs, unit_bounds = _mixed_tokens_with_units(units, tagged=True)
+        tokens = [w for w, _ in pairs]
+        tag_ids = TAGS.encode([f for _, f in pairs])
+    else:
+        tokens, unit_bounds = _mixed_tokens_with_units(units)
+    vocab = current_vocab()
+    return DocumentAnalysis(
+        key, pack(units), vocab.encode(tokens), unit_bounds, sentence_units, pack(sentences), vocab, tag_ids=tag_ids
+    )
+
+
+def _get_or_build(kind, payload, tokenizer, build_units):
+    if isinstance(payload, PackedTexts):
+        digest = payload.digest()
+    else:
+        digest = hashlib.sha256(payload.encode("utf-8", "surrogatepass")).hexdigest()
+    key = (kind, digest, tokenizer, ANALYSIS_VERSION)
+    with _cache_lock:
+        analysis = _cache.get(key)
+        if analysis is not None:
+            _cache.move_to_end(key)
+            return analysis
+    analysis = _build(key, *build_units(), tokenizer)
+    with _cache_lock:
+        _cache[key] = analysis
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return analysis
+
+
+def analyze_text(text, tokenizer="mixed"):
+    """分析一段清洗后文本：按句末标点切成单元，长度 >= 5 的单元即 process_text_cleaning 输出的句子。
+    以内容哈希为键缓存（清洗参数已体现在文本内容里）；tokenizer 为 "posseg" 时同时标注词性"""
+    text = text or ""
+
+    def _units():
+        units = _SENTENCE_SPLIT_RE.split(text)
+        sentence_units = [i for i, u in enumerate(units) if len(u.strip()) >= 5]
+        return units, sentence_units, [units[i].strip() + "。" for i in sentence_units]
+
+    return _get_or_build("text", text, tokenizer, _units)
+
+
+def analyze_sentences(sentences, tokenizer="mixed"):
+    """分析句子序列（列表或 PackedTexts），每句为一个单元，句序与传入序列一致"""
+    sentences = pack(sentences)
+    return _get_or_build(
+        "sentences", sentences, tokenizer, lambda: (list(sentences), list(range(len(sentences))), sentences)
+    )
+
+
+def analyze_units(units, tokenizer="jieba"):
+    """分析段落等任意单元列表（NLP 页面按段落分词时使用），tokenizer 可选 jieba 或 whitespace"""
+    units = [str(u) for u in units]
+    return _get_or_build("units", "\x00".join(units), tokenizer, lambda: (units, list(range(len(units))), units))
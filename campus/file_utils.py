@@ -1,10 +1,160 @@
 """文件加载工具：读取txt/docx/pdf/csv格式文件"""
+import io
+import os
+from io import BytesIO
+from collections import namedtuple
+from concurrent.futures import as_completed
+
 import pandas as pd
 from docx import Document
 import PyPDF2
 
+from . import parallel
+
+
+# 解析逻辑（输出文本）发生变化时递增，使 parse_cache 中的旧结果失效
+PARSER_VERSION = 3
+
+# 页数达到该阈值的 PDF 默认走多进程分页提取
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("CAMPUS_PDF_PARALLEL_MIN_PAGES", "120"))
+# 每个子任务负责的连续页数
+PDF_PAGES_PER_TASK = 8
+# 分块读取 CSV 时每块的行数（同时也是流式单元的行数）
+CSV_ROWS_PER_UNIT = 2000
+
+# 流式读取的文本单元：kind 为 line/paragraph/page/rows，offset 为该单元在整份文本中的字符起点
+FileUnit = namedtuple("FileUnit", ["kind", "index", "offset", "text"])
+
+_worker_reader = None
+
+
+def _init_pdf_worker(data):
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(BytesIO(data))
+
+
+def _extract_pdf_range(start, end):
+    return start, [_worker_reader.pages[i].extract_text() for i in range(start, end)]
+
+
+def _read_all_bytes(file):
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    return file.read()
+
+
+def _extract_pdf_pages_parallel(data, total, progress=None, max_workers=None):
+    """按页区间切分到进程池提取，按原页序拼回"""
+    pages = [None] * total
+    done = 0
+    with parallel.new_pool(max_workers, initializer=_init_pdf_worker, initargs=(data,)) as pool:
+        futures = [
+            pool.submit(_extract_pdf_range, start, min(start + PDF_PAGES_PER_TASK, total))
+            for start in range(0, total, PDF_PAGES_PER_TASK)
+        ]
+        for fut in as_completed(futures):
+            start, texts = fut.result()
+            pages[start : start + len(texts)] = texts
+            done += len(texts)
+            if progress is not None:
+                progress(done, total)
+    return pages
+
+
+def _extract_pdf_pages(file, progress=None, parallel_min_pages=None):
+    data = _read_all_bytes(file)
+    pdf_reader = PyPDF2.PdfReader(BytesIO(data))
+    total = len(pdf_reader.pages)
+    if parallel_min_pages is None:
+        parallel_min_pages = PDF_PARALLEL_MIN_PAGES
+    if 0 < parallel_min_pages <= total and not parallel.in_worker():
+        try:
+            return _extract_pdf_pages_parallel(data, total, progress)
+        except Exception as e:
+            print(f"PDF 并行提取失败，回退为单进程：{str(e)}")
+    pages = []
+    for i, page in enumerate(pdf_reader.pages, 1):
+        pages.append(page.extract_text())
+        if progress is not None:
+            progress(i, total)
+    return pages
+
+
+def _iter_csv_chunks(file, columns=None, chunksize=CSV_ROWS_PER_UNIT):
+    # 各列一律按字符串读入，读取哪些列不受各块推断出的类型影响；首块前先产出表头
+    header = True
+    for chunk in pd.read_csv(file, chunksize=chunksize, usecols=columns, dtype=str):
+        rows = [" ".join(v.strip() for v in row if v.strip()) for row in chunk.fillna("").itertuples(index=False, name=None)]
+        if header:
+            rows.insert(0, " ".join(str(c).strip() for c in chunk.columns))
+            header = False
+        yield rows
+
+
+def iter_csv_rows(file, columns=None, chunksize=CSV_ROWS_PER_UNIT):
+    """分块流式读取 CSV，首行为表头，其后逐行产出各列非空单元格以空格拼接的结果（不对齐补空格，空单元格省略）；
+    columns 指定要读取的列，缺省读取全部列。结果可直接作为 text_cleaner.iter_text_cleaning 的输入"""
+    for rows in _iter_csv_chunks(file, columns, chunksize):
+        yield from rows
+
+
+def _iter_txt_units(file):
+    reader = io.TextIOWrapper(file, encoding="utf-8", newline="\n")
+    try:
+        ended_with_newline = False
+        for line in reader:
+            ended_with_newline = line.endswith("\n")
+            yield "line", line[:-1] if ended_with_newline else line
+        if ended_with_newline:
+            yield "line", ""
+    finally:
+        reader.detach()
+
+
+def _iter_raw_units(file, file_type):
+    if file_type == "txt":
+        yield from _iter_txt_units(file)
+    elif file_type == "docx":
+        for para in Document(file).paragraphs:
+            yield "paragraph", para.text
+    elif file_type == "pdf":
+        for page in PyPDF2.PdfReader(file).pages:
+            yield "page", page.extract_text()
+    elif file_type == "csv":
+        for rows in _iter_csv_chunks(file):
+            yield "rows", "\n".join(rows)
+
+
+def iter_file_units(file):
+    """惰性逐单元读取文件：PDF 逐页、DOCX 逐段、TXT 逐行、CSV 按行块；
+    各单元以 "\n" 相连即为整份文本，offset 为单元在其中的字符起点"""
+    file_type = file.name.split(".")[-1].lower()
+    offset = 0
+    try:
+        for index, (kind, text) in enumerate(_iter_raw_units(file, file_type)):
+            text = text or ""
+            yield FileUnit(kind, index, offset, text)
+            offset += len(text) + 1
+    except Exception as e:
+        print(f"读取文件失败：{str(e)}")
+
+
+def read_preview(file, limit=1500):
+    """只解码预览所需的前若干单元，返回 (预览文本, 是否被截断)"""
+    parts = []
+    size = 0
+    for unit in iter_file_units(file):
+        parts.append(unit.text)
+        size = unit.offset + len(unit.text)
+        if size > limit:
+            break
+    preview = "\n".join(parts)
+    return preview[:limit], size > limit
+
 
-def load_file(file):
+def load_file(file, progress=None, parallel_min_pages=None, columns=None):
+    """读取文件为文本；progress(done, total) 用于汇报 PDF 逐页进度，
+    parallel_min_pages 覆盖 PDF 并行提取的页数阈值（0 表示禁用并行），columns 为 CSV 的列选择"""
     file_type = file.name.split(".")[-1].lower()
     try:
         if file_type == "txt":
@@ -13,11 +163,9 @@ def load_file(file):
             doc = Document(file)
             return "\n".join([para.text for para in doc.paragraphs])
         elif file_type == "pdf":
-            pdf_reader = PyPDF2.PdfReader(file)
-            return "\n".join([page.extract_text() for page in pdf_reader.pages])
+            return "\n".join(_extract_pdf_pages(file, progress, parallel_min_pages))
         elif file_type == "csv":
-            df = pd.read_csv(file)
-            return df.to_string(index=False)
+            return "\n".join(iter_csv_rows(file, columns))
         else:
             return ""
     except Exception as e:
@@ -0,0 +1,27 @@
+"""章节批处理：多个章节的文件解析、文本清洗在有界进程池上并发执行，逐章节回报结果与错误"""
+import os
+from io import BytesIO
+
+from . import file_utils, parallel, parse_cache, text_cleaner
+
+
+# 章节批处理的并发上限（再受 parallel.MAX_WORKERS 约束）
+INGEST_MAX_WORKERS = int(os.getenv("CAMPUS_INGEST_WORKERS", "4"))
+
+
+def parse_chapter(name, data, digest=None):
+    """解析单个章节文件（工作进程内不再嵌套开 PDF 进程池）"""
+    return parse_cache.load_file_cached(name, data, digest=digest)
+
+
+def clean_chapter(raw_text, options, csv_data=None):
+    """按统一的预处理参数清洗单个章节。CSV 章节可改传原文件字节 csv_data（raw_text 传 None）：
+    分块读出的行文本直接送入流式清洗，不再拼出整份原始文本，结果与清洗 load_file 的输出相同"""
+    if csv_data is not None:
+        return text_cleaner.process_text_cleaning(file_utils.iter_csv_rows(BytesIO(csv_data)), **options)
+    return text_cleaner.process_text_cleaning(raw_text, **options)
+
+
+def run_chapter_jobs(fn, jobs, max_workers=None):
+    """在 ingest 常驻进程池上并发执行章节解析/清洗任务，产出规则同 parallel.run_chapter_jobs"""
+    return parallel.run_chapter_jobs(fn, jobs, max_workers or INGEST_MAX_WORKERS, pool_name="ingest")
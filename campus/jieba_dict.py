@@ -0,0 +1,147 @@
+"""jieba 词典预编译：把 jieba 主词典与领域词表编译为一个二进制文件（前缀词典 + 词频总和 + 词性），
+一次读入并反序列化后写入 jieba 默认分词器，跳过 dict.txt 逐行解析与 jieba 自带缓存的分块读取。
+载入结果是各进程私有的字典，不跨进程共享内存。写入的是 jieba 内部字段，仅在验证过的 jieba 版本上启用，
+其余版本直接走 jieba.initialize()。
+
+预编译：python -m aid_integrated.campus.jieba_dict
+"""
+import os
+import sys
+import time
+import marshal
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+import jieba
+
+
+_CAMPUS_DIR = Path(__file__).resolve().parent
+
+DICT_DIR = Path(os.getenv("CAMPUS_JIEBA_DICT_DIR", str(_CAMPUS_DIR.parent / "data" / "jieba_dict")))
+# 领域词表（jieba 用户词典格式：词 [词频] [词性]），多个路径以 os.pathsep 分隔，不存在的跳过
+USER_DICT_PATHS = [p for p in os.getenv("CAMPUS_JIEBA_USERDICT", str(_CAMPUS_DIR / "userdict.txt")).split(os.pathsep) if p]
+
+_FORMAT_VERSION = 1
+# 验证过内部字段（FREQ / total / user_word_tag_tab / initialized / gen_pfdict）的 jieba 版本
+_SUPPORTED_JIEBA_VERSIONS = ("0.42", "0.42.1")
+_INTERNAL_ATTRS = ("FREQ", "total", "user_word_tag_tab", "initialized", "lock", "gen_pfdict", "get_dict_file")
+_MAGIC = b"CAMPUS-JIEBA-DICT\n"
+
+_lock = threading.Lock()
+_loaded = False
+_failed = False
+_preload_thread = None
+
+
+def supported():
+    """当前 jieba 的内部结构是否与预编译词典的写入方式一致"""
+    return jieba.__version__ in _SUPPORTED_JIEBA_VERSIONS and all(hasattr(jieba.dt, a) for a in _INTERNAL_ATTRS)
+
+
+def _main_dict_path():
+    if jieba.dt.dictionary is None:
+        return Path(jieba.__file__).resolve().parent / jieba.DEFAULT_DICT_NAME
+    return Path(jieba.dt.dictionary)
+
+
+def _sources():
+    return [_main_dict_path()] + [Path(p) for p in USER_DICT_PATHS if os.path.isfile(p)]
+
+
+def compiled_path():
+    """当前词典来源对应的编译产物路径（来源文件或 jieba 版本变化后路径随之变化）"""
+    h = hashlib.sha256(f"{_FORMAT_VERSION}|{jieba.__version__}".encode("utf-8"))
+    for path in _sources():
+        st = os.stat(path)
+        h.update(f"|{path}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    return DICT_DIR / f"{h.hexdigest()[:16]}.bin"
+
+
+def build(path=None):
+    """编译词典并原子写入，返回产物路径"""
+    path = Path(path) if path is not None else compiled_path()
+    tokenizer = jieba.Tokenizer(jieba.dt.dictionary)
+    tokenizer.FREQ, tokenizer.total = tokenizer.gen_pfdict(tokenizer.get_dict_file())
+    tokenizer.initialized = True
+    for user_dict in _sources()[1:]:
+        tokenizer.load_userdict(str(user_dict))
+
+    payload = marshal.dumps((tokenizer.FREQ, tokenizer.total, tokenizer.user_word_tag_tab))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC)
+            f.write(payload)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"不是有效的词典编译文件：{path}")
+        return marshal.loads(f.read())
+
+
+def load():
+    """把编译好的词典装入 jieba 默认分词器（产物缺失或过期时先编译）；
+    已载入时立即返回。jieba 版本未经验证时改用 jieba.initialize()。
+    失败时返回 False（不再重试），jieba 将按原方式自行加载"""
+    global _loaded, _failed
+    if _loaded or _failed:
+        return _loaded
+    with _lock:
+        if _loaded or _failed:
+            return _loaded
+        if getattr(jieba.dt, "initialized", False):
+            _loaded = True
+            return True
+        if not supported():
+            try:
+                jieba.initialize()
+                _loaded = True
+            except Exception as e:
+                _failed = True
+                print(f"载入 jieba 词典失败：{str(e)}")
+            return _loaded
+        try:
+            start = time.time()
+            path = compiled_path()
+            if not path.exists():
+                build(path)
+            freq, total, word_tags = _read(path)
+            with jieba.dt.lock:
+                jieba.dt.FREQ, jieba.dt.total = freq, total
+                jieba.dt.user_word_tag_tab.update(word_tags)
+                jieba.dt.initialized = True
+            jieba.default_logger.debug(f"Loaded compiled dict {path} in {time.time() - start:.3f}s")
+            _loaded = True
+        except Exception as e:
+            _failed = True
+            print(f"载入预编译词典失败：{str(e)}")
+        return _loaded
+
+
+def preload_async():
+    """在后台线程提前载入词典，首个分词请求无需等待（重复调用无副作用）"""
+    global _preload_thread
+    with _lock:
+        if _loaded or _failed or _preload_thread is not None:
+            return
+        _preload_thread = threading.Thread(target=load, name="jieba-dict-preload", daemon=True)
+        _preload_thread.start()
+
+
+if __name__ == "__main__":
+    if not supported():
+        sys.exit(f"jieba {jieba.__version__} 未经验证，不支持预编译词典")
+    out = build(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"词典已编译：{out}")
@@ -0,0 +1,100 @@
+"""紧凑文本序列：一组短字符串存为一段连续缓冲区加 int64 边界数组，按需切出单个字符串"""
+import hashlib
+from collections.abc import Sequence
+
+import numpy as np
+
+
+class PackedTexts(Sequence):
+    """只读字符串序列。第 i 项为 buffer[bounds[i]:bounds[i + 1]]；
+    连续切片与原序列共用同一缓冲区，不复制文本"""
+
+    __slots__ = ("buffer", "bounds")
+
+    def __init__(self, buffer="", bounds=None):
+        self.buffer = buffer
+        self.bounds = np.zeros(1, dtype=np.int64) if bounds is None else bounds
+
+    def __len__(self):
+        return len(self.bounds) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return pack([self[j] for j in range(start, stop, step)])
+            return PackedTexts(self.buffer, self.bounds[start:max(start, stop) + 1])
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("PackedTexts index out of range")
+        return self.buffer[int(self.bounds[i]):int(self.bounds[i + 1])]
+
+    def __iter__(self):
+        buf = self.buffer
+        bounds = self.bounds.tolist()
+        for start, end in zip(bounds, bounds[1:]):
+            yield buf[start:end]
+
+    def __eq__(self, other):
+        if isinstance(other, PackedTexts):
+            return len(self) == len(other) and self.text() == other.text() and np.array_equal(
+                self.lengths(), other.lengths()
+            )
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"PackedTexts(n={len(self)}, chars={int(self.bounds[-1] - self.bounds[0])})"
+
+    def __reduce__(self):
+        # 切片视图序列化时只带走自己覆盖的那段文本
+        return (PackedTexts, (self.text(), self.bounds - self.bounds[0]))
+
+    def text(self):
+        """本序列覆盖的连续文本（各项直接拼接）"""
+        return self.buffer[int(self.bounds[0]):int(self.bounds[-1])]
+
+    def lengths(self):
+        """各项字符数（int64 数组）"""
+        return np.diff(self.bounds)
+
+    def digest(self):
+        """内容与切分方式的 SHA-256，用作缓存键"""
+        h = hashlib.sha256(self.text().encode("utf-8", "surrogatepass"))
+        h.update(np.ascontiguousarray(self.lengths(), dtype="<i8").tobytes())
+        return h.hexdigest()
+
+
+def pack(strings):
+    """把字符串序列打包为 PackedTexts（已是 PackedTexts 时原样返回）"""
+    if isinstance(strings, PackedTexts):
+        return strings
+    strings = [str(s) for s in strings]
+    bounds = np.zeros(len(strings) + 1, dtype=np.int64)
+    if strings:
+        np.cumsum(np.fromiter(map(len, strings), dtype=np.int64, count=len(strings)), out=bounds[1:])
+    return PackedTexts("".join(strings), bounds)
+
+
+def concat(parts):
+    """按顺序拼接多个序列为一个 PackedTexts；各部分是同一缓冲区上首尾相接的切片时直接返回视图，不复制文本"""
+    parts = [pack(p) for p in parts]
+    if not parts:
+        return PackedTexts()
+    first = parts[0]
+    if all(p.buffer is first.buffer for p in parts) and all(
+        int(a.bounds[-1]) == int(b.bounds[0]) for a, b in zip(parts, parts[1:])
+    ):
+        return PackedTexts(first.buffer, np.concatenate([first.bounds[:1]] + [p.bounds[1:] for p in parts]))
+    buffer = "".join(p.text() for p in parts)
+    bounds = [np.zeros(1, dtype=np.int64)]
+    offset = 0
+    for p in parts:
+        bounds.append(p.bounds[1:] - p.bounds[0] + offset)
+        offset += int(p.bounds[-1] - p.bounds[0])
+    return PackedTexts(buffer, np.concatenate(bounds))
@@ -0,0 +1,120 @@
+"""进程池工具：统一的 spawn 进程池创建、并发上限、工作进程标记与按章节划分的任务并发执行"""
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _default_max_workers():
+    env = os.getenv("CAMPUS_MAX_WORKERS", "").strip()
+    if env.isdigit() and int(env) > 0:
+        return int(env)
+    return min(4, os.cpu_count() or 1)
+
+
+MAX_WORKERS = _default_max_workers()
+
+_IN_WORKER = False
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def in_worker():
+    """当前是否运行在本模块创建的工作进程中（用于避免嵌套开池）"""
+    return _IN_WORKER
+
+
+def _worker_init(initializer, initargs):
+    global _IN_WORKER
+    _IN_WORKER = True
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def resolve_workers(max_workers=None):
+    """将调用方给出的并发数限制在全局上限内"""
+    if not max_workers or max_workers <= 0:
+        return MAX_WORKERS
+    return max(1, min(int(max_workers), MAX_WORKERS))
+
+
+def new_pool(max_workers=None, initializer=None, initargs=()):
+    """新建一个 spawn 进程池（Streamlit 主进程多线程，fork 不安全）"""
+    return ProcessPoolExecutor(
+        max_workers=resolve_workers(max_workers),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_worker_init,
+        initargs=(initializer, initargs),
+    )
+
+
+def shared_pool(name, max_workers=None, initializer=None, initargs=()):
+    """按 (名称, 并发数) 获取常驻进程池，首次调用时创建，进程退出时统一关闭。
+    同名但并发数不同的调用各用各的进程池；initializer 只在创建时生效，同名调用须传入相同的 initializer"""
+    key = (name, resolve_workers(max_workers))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = new_pool(max_workers, initializer, initargs)
+            _pools[key] = pool
+        return pool
+
+
+def discard_pool(name):
+    """丢弃该名称下损坏的常驻进程池（如工作进程崩溃），下次调用时重建"""
+    with _pools_lock:
+        pools = [_pools.pop(key) for key in list(_pools) if key[0] == name]
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_inline(fn, jobs):
+    for name, args in jobs:
+        try:
+            yield name, fn(*args), None
+        except Exception as e:
+            yield name, None, e
+
+
+def run_chapter_jobs(fn, jobs, max_workers=None, pool_name="chapters"):
+    """并发执行按章节划分的任务。jobs 为 {章节名: 参数元组}，fn 须为模块级函数；
+    按完成顺序产出 (章节名, 结果, 异常)，单个章节失败不影响其他章节。
+    不同类型的任务可用 pool_name 分开使用各自的常驻进程池"""
+    items = list(jobs.items())
+    if len(items) <= 1 or in_worker():
+        yield from _run_inline(fn, items)
+        return
+
+    futures = {}
+    pending = {}
+    submitted = 0
+    try:
+        pool = shared_pool(pool_name, max_workers)
+        for name, args in items:
+            fut = pool.submit(fn, *args)
+            futures[fut] = pending[fut] = (name, args)
+            submitted += 1
+        for fut in as_completed(futures):
+            name, args = pending.pop(fut)
+            try:
+                yield name, fut.result(), None
+            except BrokenProcessPool:
+                pending[fut] = (name, args)
+                raise
+            except Exception as e:
+                yield name, None, e
+    except BrokenProcessPool:
+        # 工作进程异常退出（提交时或运行中）：丢弃进程池，剩余章节在当前进程内完成
+        discard_pool(pool_name)
+        yield from _run_inline(fn, list(pending.values()) + items[submitted:])
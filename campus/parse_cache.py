@@ -0,0 +1,100 @@
+"""文件解析缓存：按文件内容 SHA-256 + 解析器版本把解析结果持久化到 data/ 目录，按总大小做 LRU 淘汰"""
+import os
+import hashlib
+import threading
+from io import BytesIO
+from pathlib import Path
+
+from . import file_utils
+
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / "data" / "parse_cache"
+MAX_CACHE_BYTES = int(os.getenv("CAMPUS_PARSE_CACHE_MB", "512")) * 1024 * 1024
+
+_evict_lock = threading.Lock()
+
+
+def cache_key(name, data=None, digest=None):
+    """缓存键：内容哈希 + 扩展名 + 解析器版本（同一份讲义无论谁上传、叫什么名字都命中同一条）；
+    已知内容哈希时可直接传 digest，免去重复计算"""
+    ext = name.split(".")[-1].lower()
+    if digest is None:
+        digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}.{ext}.v{file_utils.PARSER_VERSION}"
+
+
+def _path(key):
+    return CACHE_DIR / key[:2] / f"{key}.txt"
+
+
+def get(key):
+    """读取缓存文本，命中时刷新访问时间；未命中返回 None"""
+    path = _path(key)
+    try:
+        text = path.read_text(encoding="utf-8")
+    except (FileNotFoundError, OSError, UnicodeDecodeError):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return text
+
+
+def put(key, text):
+    """原子写入缓存，写入后按总大小淘汰最久未访问的条目"""
+    path = _path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"写入解析缓存失败：{str(e)}")
+        return
+    evict()
+
+
+def evict(max_bytes=None):
+    """按 mtime 从旧到新删除，直到缓存总大小不超过上限"""
+    limit = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        total = 0
+        for path in CACHE_DIR.glob("*/*.txt"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= limit:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+def lookup(name, data=None, digest=None):
+    """仅查缓存，不触发解析"""
+    return get(cache_key(name, data, digest))
+
+
+def load_file_cached(name, data, progress=None, digest=None):
+    """带持久化缓存的 file_utils.load_file；解析失败（空文本）不写缓存"""
+    key = cache_key(name, data, digest)
+    text = get(key)
+    if text is not None:
+        return text
+    buf = BytesIO(data)
+    buf.name = name
+    text = file_utils.load_file(buf, progress=progress)
+    if text:
+        put(key, text)
+    return text
@@ -0,0 +1,78 @@
+"""停用词注册表：进程内共享、按名称索引的不可变停用词集合，仅在词表文件 mtime 变化时重新加载"""
+import os
+import threading
+from pathlib import Path
+
+
+_CAMPUS_DIR = Path(__file__).resolve().parent
+_NLP_DIR = _CAMPUS_DIR.parent / "nlp"
+
+# 名称 -> (词表路径, 是否统一转小写)
+_SOURCES = {
+    "campus_cn": (_CAMPUS_DIR / "stopwords.txt", False),
+    "campus_en": (_CAMPUS_DIR / "en_stopwords.txt", True),
+    "nlp": (_NLP_DIR / "stopwords.txt", False),
+}
+
+_lock = threading.Lock()
+_lists = {}
+_combined = {}
+
+
+def register(name, path, lower=False):
+    """注册（或替换）一份停用词表"""
+    with _lock:
+        _SOURCES[name] = (Path(path), lower)
+        _lists.pop(name, None)
+        _combined.clear()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read(path, lower):
+    words = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                word = line.strip()
+                if word:
+                    words.add(word.lower() if lower else word)
+    except (OSError, UnicodeDecodeError):
+        pass
+    return frozenset(words)
+
+
+def get_stopwords(name):
+    """按名称取停用词集合（frozenset），文件不存在时为空集"""
+    path, lower = _SOURCES[name]
+    mtime = _mtime(path)
+    cached = _lists.get(name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _lock:
+        cached = _lists.get(name)
+        if cached is None or cached[0] != mtime:
+            words = _read(path, lower) if mtime is not None else frozenset()
+            cached = (mtime, words)
+            _lists[name] = cached
+        return cached[1]
+
+
+def get_combined(names, extra=frozenset()):
+    """多份词表与额外词的并集，按 (名称, 额外词) 缓存，任一词表重载后自动重建"""
+    names = tuple(names)
+    extra = frozenset(extra)
+    parts = [get_stopwords(name) for name in names]
+    key = (names, extra)
+    cached = _combined.get(key)
+    if cached is not None and all(a is b for a, b in zip(cached[0], parts)):
+        return cached[1]
+    words = frozenset(extra.union(*parts))
+    with _lock:
+        _combined[key] = (parts, words)
+    return words
@@ -1,149 +1,488 @@
 """摘要与章节梳理工具"""
+import os
 import re
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from .text_cleaner import load_custom_stopwords, tokenize_mixed, process_text_cleaning
+from scipy.sparse import coo_matrix, csr_matrix, vstack
+from sklearn.feature_extraction.text import TfidfTransformer
+from .text_cleaner import load_custom_stopwords, process_text_cleaning
+from .doc_analysis import analyze_sentences
+from .packed_text import pack
+from .vocab import current_vocab, remap
+from . import textrank
 
 
-def get_content_keywords(sentences):
-    """动态挖掘文本核心关键词（纯通用，不绑定主题）"""
-    common_stopwords = set(load_custom_stopwords()) | {"的", "了", "是", "在", "有", "和", "就", "也", "都", "要", "能", "会"}
-    full_text = "".join(sentences)
-    full_text = re.sub(r"[^\u4e00-\u9fa5a-zA-Z0-9]", "", full_text)
-    words = tokenize_mixed(full_text)
-    words = [w for w in words if w not in common_stopwords and len(w) >= 2]
-    if not words:
-        return []
-    vectorizer = TfidfVectorizer()
-    try:
-        tfidf_matrix = vectorizer.fit_transform([" ".join(words)])
-        word_scores = dict(zip(vectorizer.get_feature_names_out(), tfidf_matrix.toarray()[0]))
-        return sorted(word_scores.keys(), key=lambda x: word_scores[x], reverse=True)[:15]
-    except Exception:
-        return list(set(words))[:15]
+_COMMON_FUNCTION_WORDS = frozenset({"的", "了", "是", "在", "有", "和", "就", "也", "都", "要", "能", "会"})
 
 
+def _keyword_counts(analysis):
+    """候选关键词（去停用词与单字）的 (词 id, 词频)"""
+    vocab, ids = analysis.vocab, analysis.token_ids
+    ids = ids[~vocab.mask(load_custom_stopwords(_COMMON_FUNCTION_WORDS))[ids] & (vocab.lengths()[ids] >= 2)]
+    return np.unique(ids, return_counts=True)
 
-def score_sentences(sentences):
-    """改进版句子评分，自动过滤英文句子"""
-    content_words = get_content_keywords(sentences)
-    scores = []
 
-    for sent in sentences:
-        english_chars = sum(1 for c in sent if "a" <= c <= "z" or "A" <= c <= "Z")
-        total_chars = len(sent.strip())
-        english_ratio = english_chars / total_chars if total_chars > 0 else 0
+def _top_keywords(word_ids, counts, vocab):
+    """整体视为一篇文档时 TF-IDF 的 idf 恒为 1，权重与词频成正比：按词频降序，同频按词典序取前 15 个"""
+    words = vocab.words(word_ids)
+    freq = np.asarray(counts).tolist()
+    order = sorted(range(len(words)), key=lambda k: (-freq[k], words[k]))
+    return [words[k] for k in order[:15]]
 
-        english_penalty = 1.0
-        if english_ratio > 0.4:
-            english_penalty = 0.3
-        elif english_ratio > 0.2:
-            english_penalty = 0.7
-        elif english_ratio > 0.1:
-            english_penalty = 0.9
 
-        sent_words = tokenize_mixed(sent)
+def get_content_keywords(sentences):
+    """动态挖掘文本核心关键词（纯通用，不绑定主题）"""
+    analysis = analyze_sentences(sentences)
+    return _top_keywords(*_keyword_counts(analysis), analysis.vocab)
+
+
+
+# 句子评分特征：结构提示词、举例提示词、完整句末标点
+_STRUCT_WORDS = ("定义", "包括", "分为", "作用", "原理", "特点", "含义", "本质", "步骤", "结论", "关键", "核心", "主要", "重要", "总结", "概述")
+_EXAMPLE_WORDS = ("例如", "比如", "举例", "如")
+_END_PUNCTS = np.array([ord(c) for c in "。！？；"], dtype=np.uint32)
+
+
+def _word_key(word):
+    key = 0
+    for c in word:
+        key = (key << 21) | ord(c)
+    return key
+
+
+def _marker_hits(codes, bounds, words):
+    """各句是否含 words 中的任一词（布尔数组）。先按首字筛出候选位置，再把候选处的 k 个码位（< 2^21，k <= 3）
+    压成 uint64 与词表比对；词不跨句"""
+    sent_end = np.repeat(bounds[1:], np.diff(bounds))
+    found = np.zeros(len(codes), dtype=bool)
+    for k in sorted({len(w) for w in words}):
+        group = [w for w in words if len(w) == k]
+        first = np.array([ord(w[0]) for w in group], dtype=codes.dtype)
+        pos = np.flatnonzero(np.isin(codes, first, kind="table"))
+        pos = pos[pos + k <= sent_end[pos]]
+        keys = np.zeros(len(pos), dtype=np.uint64)
+        for j in range(k):
+            keys = (keys << np.uint64(21)) | codes[pos + j].astype(np.uint64)
+        found[pos[np.isin(keys, np.array([_word_key(w) for w in group], dtype=np.uint64))]] = True
+    counts = np.concatenate(([0], np.cumsum(found)))
+    return counts[bounds[1:]] > counts[bounds[:-1]]
+
+
+class SentenceStats:
+    """一组句子（通常是一个章节）与关键词无关的评分中间结果：各句词 id（词表 vocab）与区间、候选关键词词频、
+    英文占比及长度/结构/标点/举例各项特征。多组统计可直接合并评分（见 merged_scores）"""
+
+    def __init__(self, vocab, token_ids, token_bounds, keyword_ids, keyword_counts, english_ratio, features):
+        self.vocab = vocab
+        self.token_ids = token_ids
+        self.token_bounds = token_bounds
+        self.keyword_ids = keyword_ids
+        self.keyword_counts = keyword_counts
+        self.english_ratio = english_ratio
+        self.features = features
+
+    def __len__(self):
+        return len(self.token_bounds)
+
+    def rebased(self, vocab):
+        """换算到另一词表的统计（词表换代后与新统计合并时使用）"""
+        if vocab is self.vocab:
+            return self
+        return SentenceStats(
+            vocab,
+            remap(self.token_ids, self.vocab, vocab),
+            self.token_bounds,
+            remap(self.keyword_ids, self.vocab, vocab),
+            self.keyword_counts,
+            self.english_ratio,
+            self.features,
+        )
+
+
+def sentence_stats(sentences):
+    """计算一组句子的 SentenceStats，各项特征在整批句子上按数组计算"""
+    packed = pack(sentences)
+    n = len(packed)
+    analysis = analyze_sentences(packed)
+    keyword_ids, keyword_counts = _keyword_counts(analysis)
+
+    codes = np.frombuffer(packed.text().encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    char_bounds = packed.bounds - packed.bounds[0]
+    is_letter = ((codes >= ord("a")) & (codes <= ord("z"))) | ((codes >= ord("A")) & (codes <= ord("Z")))
+    letters = np.concatenate(([0], np.cumsum(is_letter)))
+    english_chars = letters[char_bounds[1:]] - letters[char_bounds[:-1]]
+    total_chars = np.fromiter(map(len, map(str.strip, packed)), dtype=np.int64, count=n)
+    english_ratio = np.divide(english_chars, total_chars, out=np.zeros(n), where=total_chars > 0)
+    english_penalty = np.select(
+        [english_ratio > 0.4, english_ratio > 0.2, english_ratio > 0.1], [0.3, 0.7, 0.9], default=1.0
+    )
+
+    sent_len = np.diff(char_bounds)
+    len_score = np.where((sent_len >= 10) & (sent_len <= 200), 1, 0.3)
+    struct_score = np.where(_marker_hits(codes, char_bounds, _STRUCT_WORDS), 0.2, 0)
+    last_char = codes[np.maximum(char_bounds[1:] - 1, 0)] if len(codes) else np.zeros(n, dtype=np.uint32)
+    completeness_score = np.where((sent_len > 0) & np.isin(last_char, _END_PUNCTS), 0.1, 0)
+    example = _marker_hits(codes, char_bounds, _EXAMPLE_WORDS)
+
+    return SentenceStats(
+        analysis.vocab,
+        analysis.token_ids,
+        analysis.sentence_token_bounds(),
+        keyword_ids,
+        keyword_counts,
+        english_ratio,
+        (len_score, struct_score, completeness_score, english_penalty, example),
+    )
+
+
+def merged_scores(stats_list):
+    """合并多组句子统计评分，关键词按全部组的词频选出；结果与对拼接后的句子调用 score_sentences 相同"""
+    stats_list = list(stats_list)
+    if not stats_list:
+        return []
+    vocab = stats_list[0].vocab
+    if any(st.vocab is not vocab for st in stats_list):
+        vocab = current_vocab()
+        stats_list = [st.rebased(vocab) for st in stats_list]
+    ids = np.concatenate([st.keyword_ids for st in stats_list]).astype(np.int64)
+    counts = np.bincount(ids, weights=np.concatenate([st.keyword_counts for st in stats_list]), minlength=len(vocab))
+    word_ids = np.flatnonzero(counts)
+    content_words = _top_keywords(word_ids, counts[word_ids].astype(np.int64), vocab)
+    is_content = np.zeros(len(vocab), dtype=bool)
+    is_content[[vocab.get_id(w) for w in content_words]] = True
 
-        core_count = sum(1 for w in sent_words if w in content_words)
-        core_score = core_count / max(len(sent_words), 1)
+    scores = []
+    for st in stats_list:
+        # 每句的关键词命中数与词数：在词 id 数组上用前缀和一次算出
+        hits = np.concatenate(([0], np.cumsum(is_content[st.token_ids])))
+        bounds = st.token_bounds
+        core_counts = hits[bounds[:, 1]] - hits[bounds[:, 0]]
+        token_counts = bounds[:, 1] - bounds[:, 0]
+        len_score, struct_score, completeness_score, english_penalty, example = st.features
 
-        sent_len = len(sent)
-        if 10 <= sent_len <= 200:
-            len_score = 1
-        else:
-            len_score = 0.3
+        core_score = core_counts / np.maximum(token_counts, 1)
+        group = ((core_score * 0.6) + (len_score * 0.2) + struct_score + completeness_score) * english_penalty
+        scores.append(np.where(example, group * 0.7, group))
+    return np.concatenate(scores).tolist()
 
-        struct_words = {
-            "定义",
-            "包括",
-            "分为",
-            "作用",
-            "原理",
-            "特点",
-            "含义",
-            "本质",
-            "步骤",
-            "结论",
-            "关键",
-            "核心",
-            "主要",
-            "重要",
-            "总结",
-            "概述",
-        }
-        struct_score = 0.2 if any(w in sent for w in struct_words) else 0
 
-        has_complete_punctuation = sent.endswith(("。", "！", "？", "；"))
-        completeness_score = 0.1 if has_complete_punctuation else 0
+def score_sentences(sentences):
+    """改进版句子评分，自动过滤英文句子"""
+    if not len(sentences):
+        return []
+    return merged_scores([sentence_stats(sentences)])
 
-        total_score = ((core_score * 0.6) + (len_score * 0.2) + struct_score + completeness_score) * english_penalty
 
-        example_words = {"例如", "比如", "举例", "比如", "如"}
-        if any(w in sent for w in example_words):
-            total_score *= 0.7
+def rank_sentences(scores, top_k=None):
+    """句子下标按得分降序排列（同分保持原文顺序），可只取前 top_k 个"""
+    order = np.argsort(-np.asarray(scores, dtype=float), kind="stable")
+    return order if top_k is None else order[:top_k]
 
-        scores.append(total_score)
 
-    return scores
+def extract_core_sentences(sentences, scores=None, english_ratio=None, top_n=10):
+    """核心知识点句：去掉空句与英文占比超过 30% 的句子，按得分排序、去重后取前 top_n 句，按原文顺序返回。
+    scores / english_ratio 可传入已算好的结果（如 merged_scores 与各章节 SentenceStats 的拼接）"""
+    if not len(sentences):
+        return []
+    if scores is None or english_ratio is None:
+        stats = sentence_stats(sentences)
+        scores = merged_scores([stats]) if scores is None else scores
+        english_ratio = stats.english_ratio if english_ratio is None else english_ratio
+    stripped = [str(s).strip() for s in sentences]
+    kept = [i for i, s2 in enumerate(stripped) if s2 and english_ratio[i] <= 0.3]
+    if not kept:
+        return []
 
+    # 全程按句子下标处理：按得分排序（同分保持原文顺序），去重后再按下标恢复原文顺序
+    order = rank_sentences([scores[i] for i in kept]).tolist()
+    seen = set()
+    out = []
+    for k in order:
+        i = kept[k]
+        norm = re.sub(r"[^\w\s]", "", stripped[i]).strip().lower()
+        if norm and norm not in seen:
+            seen.add(norm)
+            out.append(i)
+        if len(out) >= top_n:
+            break
+
+    out.sort()
+    return [stripped[i] for i in out]
+
+
+
+# 图排序摘要参数：每句保留的近邻数、成边的最低相似度、MMR 中相关性与去冗余的权衡
+GRAPH_TOP_K = 10
+GRAPH_MIN_SIMILARITY = 0.05
+MMR_LAMBDA = 0.7
+# 出现在超过这么多句子里的词不参与近邻计算（idf 低、贡献小，却让相似度计算量随句数平方增长）
+GRAPH_MAX_TERM_DF = 1000
+# 计算句子相似度时单个分块的内存上限（MB），按每个候选句对约 32 字节估算分块大小
+GRAPH_MEMORY_MB = int(os.getenv("CAMPUS_SUMMARY_GRAPH_MEMORY_MB", "64"))
+
+
+def sentence_term_counts(sentences):
+    """句子 x 词的词频矩阵（列为词 id，去停用词与单字），返回 (矩阵, 词表)。多组结果可用 stack_term_counts 合并"""
+    analysis = analyze_sentences(sentences)
+    vocab, ids = analysis.vocab, analysis.token_ids
+    bounds = analysis.sentence_token_bounds()
+    rows = np.repeat(np.arange(len(bounds)), bounds[:, 1] - bounds[:, 0])
+    keep = ~vocab.mask(load_custom_stopwords(_COMMON_FUNCTION_WORDS))[ids] & (vocab.lengths()[ids] >= 2)
+    counts = csr_matrix(
+        (np.ones(int(keep.sum()), dtype=np.float32), (rows[keep], ids[keep])), shape=(len(bounds), len(vocab))
+    )
+    counts.sum_duplicates()
+    return counts, vocab
+
+
+def stack_term_counts(parts):
+    """按顺序纵向拼接多组 sentence_term_counts 的结果，各组词表不同时列统一换算到当前词表"""
+    parts = list(parts)
+    vocab = parts[0][1]
+    if any(v is not vocab for _, v in parts):
+        vocab = current_vocab()
+    matrices = [_rebase_columns(m, v, vocab) for m, v in parts]
+    width = len(vocab)
+    return vstack([m if m.shape[1] == width else _pad_columns(m, width) for m in matrices], format="csr")
+
+
+def _rebase_columns(matrix, source, target):
+    if source is target:
+        return matrix
+    uniq, inverse = np.unique(matrix.indices, return_inverse=True)
+    indices = remap(uniq.astype(np.uint32), source, target).astype(matrix.indices.dtype)[inverse.reshape(-1)]
+    return csr_matrix((matrix.data, indices, matrix.indptr), shape=(matrix.shape[0], len(target)))
+
+
+def _pad_columns(matrix, width):
+    return csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], width))
+
+
+def _sentence_tfidf(counts):
+    """句子 x 词的 TF-IDF 矩阵（float32，行已 L2 归一化），只保留出现过的词列"""
+    counts = counts[:, np.unique(counts.indices)]
+    return TfidfTransformer(sublinear_tf=True).fit_transform(counts).astype(np.float32)
+
+
+def _row_top_k(sims, row_offset, top_k, min_similarity):
+    """稀疏相似度块中每行取最大的 top_k 个（去掉自身与低于阈值的），返回 (行, 列, 权重)"""
+    row_of = np.repeat(np.arange(sims.shape[0]), np.diff(sims.indptr)) + row_offset
+    ok = (sims.indices != row_of) & (sims.data > min_similarity)
+    rows, cols, vals = row_of[ok], sims.indices[ok], sims.data[ok]
+    # 按 (行, 权重降序) 排序：余弦相似度不超过 1，行号 * 2 - 权重即可作为单一排序键
+    order = np.argsort(rows * 2.0 - vals)
+    rows, cols, vals = rows[order], cols[order], vals[order]
+    # 排序后各行连续，行内名次 = 位置 - 该行起点
+    per_row = np.bincount(rows - row_offset, minlength=sims.shape[0])
+    starts = np.cumsum(per_row) - per_row
+    top = np.arange(len(rows)) - np.repeat(starts, per_row) < top_k
+    return rows[top], cols[top], vals[top]
+
+
+def _similarity_graph(vectors, top_k=GRAPH_TOP_K, min_similarity=GRAPH_MIN_SIMILARITY):
+    """分块计算余弦相似度（稀疏乘积），每句只保留 top_k 个最相似的句子，返回对称稀疏邻接矩阵。
+    每块的候选句对数按倒排表长度事先算出，使单块内存不超过 GRAPH_MEMORY_MB"""
+    n = vectors.shape[0]
+    df = np.bincount(vectors.indices, minlength=vectors.shape[1])
+    vectors = vectors.multiply((df <= GRAPH_MAX_TERM_DF)[None, :].astype(np.float32)).tocsr()
+    vectors.eliminate_zeros()
+    df = np.bincount(vectors.indices, minlength=vectors.shape[1])
+    # 第 i 句的候选句对数上限 = 其各词倒排表长度之和
+    pair_counts = np.bincount(
+        np.repeat(np.arange(n), np.diff(vectors.indptr)), weights=df[vectors.indices], minlength=n
+    )
+    cum = np.cumsum(pair_counts)
+    budget = max(GRAPH_MEMORY_MB * 2**20 // 32, 1)
+    transposed = vectors.T.tocsr()
+    rows, cols, vals = [], [], []
+    start = 0
+    while start < n:
+        base = cum[start - 1] if start else 0
+        stop = max(int(np.searchsorted(cum, base + budget, side="right")), start + 1)
+        stop = min(stop, n)
+        block = _row_top_k(vectors[start:stop] @ transposed, start, top_k, min_similarity)
+        rows.append(block[0])
+        cols.append(block[1])
+        vals.append(block[2])
+        start = stop
+    graph = coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n)).tocsr()
+    return graph.maximum(graph.T)
+
+
+def _mmr_select(vectors, relevance, top_n, mmr_lambda=MMR_LAMBDA):
+    """最大边际相关（MMR）：在得分靠前的候选中逐个挑选与已选句最不重复的句子，返回下标（挑选顺序）"""
+    candidates = rank_sentences(relevance, max(10 * top_n, 50))
+    sims = (vectors[candidates] @ vectors[candidates].T).toarray()
+    rel = relevance[candidates]
+    max_sim = np.zeros(len(candidates))
+    available = np.ones(len(candidates), dtype=bool)
+    picked = []
+    for _ in range(min(top_n, len(candidates))):
+        mmr = np.where(available, mmr_lambda * rel - (1 - mmr_lambda) * max_sim, -np.inf)
+        j = int(np.argmax(mmr))
+        picked.append(j)
+        available[j] = False
+        max_sim = np.maximum(max_sim, sims[j])
+    return candidates[picked]
+
+
+def graph_rank_sentences(sentences, top_n=8, term_counts=None):
+    """图排序 + MMR 抽取式摘要：TF-IDF 句向量建稀疏近邻图，幂迭代求句子重要度，再按 MMR 去冗余挑选 top_n 句，
+    返回句子下标（挑选顺序）。term_counts 可传入已算好的词频矩阵（sentence_term_counts / stack_term_counts）"""
+    if not len(sentences):
+        return np.zeros(0, dtype=np.int64)
+    if term_counts is None:
+        term_counts = sentence_term_counts(pack(sentences))[0]
+    if not term_counts.nnz:
+        # 去停用词与单字后没有任何词，无法构图，退回关键句评分
+        return rank_sentences(score_sentences(sentences), top_n)
+    vectors = _sentence_tfidf(term_counts)
+    relevance = textrank.rank(_similarity_graph(vectors))
+    return _mmr_select(vectors, relevance, top_n)
+
+
+
+# 章节标题：中文“第X章/节/部分…”、英文“chapter 3 / section 2.1”（清洗后已小写、去空白）、句首编号“3.2”
+_CN_NUMERALS = "零〇一二三四五六七八九十百千两"
+_HEADING_RE = re.compile(
+    rf"(?P<cn>第[{_CN_NUMERALS}\d]+(?P<cn_kind>章|节|部分|篇|讲|单元))"
+    r"|(?<![a-z])(?P<en_kind>chapter|section|part|unit)\s*(?P<en_num>\d+(?:\.\d+)*)"
+    r"|^(?P<num>[1-9]\d?(?:\.\d{1,2}){1,3})(?=[\u4e00-\u9fffa-z])",
+    re.IGNORECASE,
+)
+# 与清洗时的分句规则相同，但数字之间的点号不断句，编号标题不会被拆开
+_OUTLINE_SPLIT_RE = re.compile(r"[。！？；,]|(?<!\d)\.|\.(?!\d)")
+# 句首编号只在短句中视为标题；紧跟数量词（如 2.5万、1.5倍）的是小数而不是编号
+_NUM_HEADING_MAX_LEN = 40
+_QUANTITY_RE = re.compile(r"万|亿|倍|%|‰|元|岁|米|秒|公里|千克")
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_UNITS = {"十": 10, "百": 100, "千": 1000}
+
+
+def _chapter_number(text):
+    """“第X章”中的序号（阿拉伯数字或中文数字）"""
+    if text.isdigit():
+        return int(text)
+    total, digit = 0, 0
+    for char in text:
+        if char in _CN_UNITS:
+            total += (digit or 1) * _CN_UNITS[char]
+            digit = 0
+        else:
+            digit = _CN_DIGITS.get(char, 0)
+    return total + digit
+
+
+def _heading(sentence):
+    """句中第一个章节标题，返回 (标题, 层级, 序号)，没有则返回 None。
+    序号：章级标题为章的序号，句首编号为各级编号的元组，其余为 None"""
+    for m in _HEADING_RE.finditer(sentence):
+        if m.group("cn"):
+            kind = m.group("cn_kind")
+            if kind == "节":
+                return m.group("cn"), 2, None
+            return m.group("cn"), 1, _chapter_number(m.group("cn")[1 : -len(kind)])
+        if m.group("en_kind"):
+            kind, num = m.group("en_kind").lower(), m.group("en_num")
+            level = num.count(".") + 1
+            if kind == "section":
+                return f"{kind.capitalize()} {num}", max(level, 2), None
+            return f"{kind.capitalize()} {num}", level, int(num.split(".")[0]) if level == 1 else None
+        if len(sentence) <= _NUM_HEADING_MAX_LEN and not _QUANTITY_RE.match(sentence, m.end()):
+            num = m.group("num")
+            return num, num.count(".") + 1, tuple(int(part) for part in num.split("."))
+    return None
+
+
+def build_chapter_index(sentences):
+    """单遍扫描句子流识别章节标题，返回章节索引 [(标题, 层级, 起始句下标, 结束句下标), ...]，
+    区间左闭右开、按出现顺序排列；第一个标题之前的句子不属于任何章节。
+    句首编号只在已识别出章级标题后才算小节，且需与所在章的序号一致、在同一章内递增，
+    否则视为正文（如以小数开头的句子；清洗后已无空白，无法靠编号后的分隔判断）"""
+    index = []
+    chapter_no = None
+    last_num = None
+    n = 0
+    for n, sentence in enumerate(sentences, 1):
+        found = _heading(sentence)
+        if found is None:
+            continue
+        title, level, number = found
+        if isinstance(number, tuple):
+            if chapter_no is None or number[0] != chapter_no or (last_num is not None and number <= last_num):
+                continue
+            last_num = number
+        elif level == 1:
+            chapter_no, last_num = number, None
+        if index:
+            index[-1][3] = n - 1
+        index.append([title, level, n - 1, None])
+    if index:
+        index[-1][3] = n
+    return [tuple(entry) for entry in index]
+
+
+def _keep_outline_sentence(sentence):
+    # 不足 5 字的短句只保留章级标题（如“第一章圆”），章的序号用于校验句首编号
+    if len(sentence) >= 5:
+        return True
+    found = _heading(sentence)
+    return found is not None and not isinstance(found[2], tuple)
+
+
+def _iter_outline_sentences(text):
+    start = 0
+    for m in _OUTLINE_SPLIT_RE.finditer(text):
+        sentence = text[start : m.start()].strip()
+        if _keep_outline_sentence(sentence):
+            yield sentence + "。"
+        start = m.end()
+    sentence = text[start:].strip()
+    if _keep_outline_sentence(sentence):
+        yield sentence + "。"
 
 
 def extract_chapter_full_sentences(text):
     """章节结构自动梳理（无空格+完整句子）"""
-    clean_text, all_sentences = process_text_cleaning(text, for_wordcloud=False)
+    clean_text, _ = process_text_cleaning(text, for_wordcloud=False)
+    all_sentences = list(_iter_outline_sentences(clean_text))
     if not all_sentences:
         return "未检测到有效句子内容"
 
-    chapter_marks = {"第一章", "第二章", "第三章", "第一节", "第二节", "第三节", "第四节", "第一部分", "第二部分", "第三部分"}
-
-    chapter_content = {}
-    current_chapter = None
-
-    for sentence in all_sentences:
-        for mark in chapter_marks:
-            if mark in sentence:
-                current_chapter = mark
-                if current_chapter not in chapter_content:
-                    chapter_content[current_chapter] = []
-                break
-        if current_chapter is not None:
-            chapter_content[current_chapter].append(sentence)
-
-    chapter_content = {k: v for k, v in chapter_content.items() if len(v) >= 1}
-    if not chapter_content:
+    chapter_index = build_chapter_index(all_sentences)
+    if not chapter_index:
         return "未检测到章节结构标志"
 
-    def chapter_sort_key(chapter):
-        num_match = re.search(r"(\d+)", chapter)
-        if num_match:
-            return int(num_match.group())
-        chinese_num = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5}
-        for cn, num in chinese_num.items():
-            if cn in chapter:
-                return num
-        return 0
-
-    sorted_chapters = sorted(chapter_content.keys(), key=chapter_sort_key)
+    # 同一标题多次出现（如目录与正文）时合并其各段内容，按首次出现的顺序输出
+    chapter_ranges = {}
+    for title, level, start, end in chapter_index:
+        chapter_ranges.setdefault((title, level), []).append((start, end))
 
     result = "【章节结构与完整内容梳理】\n"
-    for chapter in sorted_chapters:
-        result += f"\n{chapter}：\n"
-        full_content = "".join(chapter_content[chapter])
+    for (title, level), ranges in chapter_ranges.items():
+        result += f"\n{'  ' * (level - 1)}{title}：\n"
+        full_content = ""
+        for start, end in ranges:
+            full_content += "".join(all_sentences[start:end])
+            if len(full_content) > 500:
+                break
         result += full_content[:500] + ("..." if len(full_content) > 500 else "") + "\n"
 
     return result
 
 
 
-def generate_summary(sentences, summary_length=100, tolerance=30):
-    """通用课程摘要生成"""
-    if not sentences:
+def generate_summary(sentences, summary_length=100, tolerance=30, method="heuristic", scores=None, term_counts=None):
+    """通用课程摘要生成。method 为 heuristic（关键句评分）或 graph（图排序 + MMR 去冗余）；
+    scores / term_counts 可传入已算好的句子得分 / 词频矩阵（按章节增量计算时使用）"""
+    if not len(sentences):
         return "无法生成有效摘要，请检查文本内容。"
 
-    sentence_scores = score_sentences(sentences)
-    scored_sents = list(zip(sentences, sentence_scores))
-    top_sents = sorted(scored_sents, key=lambda x: x[1], reverse=True)[:8]
-    top_sents = sorted(top_sents, key=lambda x: sentences.index(x[0]))
+    if method == "graph":
+        top_idx = graph_rank_sentences(sentences, 8, term_counts=term_counts)
+    else:
+        top_idx = rank_sentences(score_sentences(sentences) if scores is None else scores, 8)
+    # 选出的 8 句按下标恢复原文顺序
+    top_sents = [sentences[i] for i in np.sort(top_idx).tolist()]
 
     summary = ""
     current_length = 0
@@ -155,7 +494,7 @@ def generate_summary(sentences, summary_length=100, tolerance=30):
     category_patterns = re.compile(r"([、，；]){3,}")
     meta_words = {"课程", "教材", "团队", "教师", "开设", "历史", "荣誉", "大学"}
 
-    for sent, _ in top_sents:
+    for sent in top_sents:
         sent_clean = sent.strip()
 
         if incomplete_patterns.match(sent_clean):
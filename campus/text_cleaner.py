@@ -1,26 +1,65 @@
 """文本清洗工具：过滤乱码、去停用词、句子切分等（保留词云所需的分词逻辑）"""
 import re
 import string
-import jieba
-from pathlib import Path
+import numpy as np
+
+from . import stopword_registry
+from .tokenize_service import PARALLEL_MIN_CHARS, tokenize_many
+
+
+
+# 字符类别位：CORE 为汉字(0x4E00-0x9FFF)/英文字母/数字，PUNCT 为 remove_garbage_chars 额外保留的核心标点
+_CLS_CORE = 1
+_CLS_PUNCT = 2
+
+
+def _build_char_table():
+    table = np.zeros(0x10001, dtype=np.uint8)
+    table[0x4E00 : 0x9FFF + 1] = _CLS_CORE
+    table[ord("a") : ord("z") + 1] = _CLS_CORE
+    table[ord("A") : ord("Z") + 1] = _CLS_CORE
+    table[ord("0") : ord("9") + 1] = _CLS_CORE
+    for char in (" ", "。", "！", "？", "；", ",", "."):
+        table[ord(char)] |= _CLS_PUNCT
+    return table
+
+
+_CHAR_TABLE = _build_char_table()
+
+
+def classify_chars(text):
+    """批量字符分类：经 UTF-32 视图查表，返回每个字符的类别位数组（BMP 以外的字符归为无效）"""
+    codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    return _CHAR_TABLE[np.minimum(codes, 0x10000)]
+
+
+_NON_CORE_RE = re.compile(r"[^\u4e00-\u9fffa-zA-Z0-9]+")
+# 短文本逐片段正则计数更快，长文本整体查表 + 前缀和更快
+_BULK_MIN_CHARS = 2048
+
+
+def _piece_core_counts(text, pieces, sep_len):
+    """text 由 pieces 依次相接（片段间隔 sep_len 个字符）而成，统计各片段的核心字符数"""
+    if len(text) < _BULK_MIN_CHARS:
+        return [len(_NON_CORE_RE.sub("", piece)) for piece in pieces]
+    core = classify_chars(text) & _CLS_CORE
+    csum = np.zeros(len(core) + 1, dtype=np.int64)
+    np.cumsum(core, out=csum[1:])
+    lengths = np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces))
+    ends = np.cumsum(lengths + sep_len) - sep_len
+    return (csum[ends] - csum[ends - lengths]).tolist()
 
 
 
 def filter_garbage_lines(text):
     """过滤包含大量乱码的行"""
     lines = text.split("\n")
+    valid_counts = _piece_core_counts(text, lines, 1)
     clean_lines = []
-    for line in lines:
-        valid_count = 0
+    for line, valid_count in zip(lines, valid_counts):
         total_count = len(line.strip())
         if total_count == 0:
             continue
-        for char in line:
-            o = ord(char)
-            if (0x4E00 <= o <= 0x9FFF) or (ord("a") <= o <= ord("z") or ord("A") <= o <= ord("Z")) or (
-                ord("0") <= o <= ord("9")
-            ):
-                valid_count += 1
         if valid_count / total_count >= 0.5:
             clean_lines.append(line)
     return "\n".join(clean_lines)
@@ -30,75 +69,51 @@ def filter_garbage_lines(text):
 def filter_garbage_segments(line):
     """过滤行内的乱码片段"""
     segments = re.split(r"([^\u4e00-\u9fa5a-zA-Z0-9\s。！？；,.])", line)
+    valid_counts = _piece_core_counts(line, segments, 0)
     clean_segments = []
-    for seg in segments:
-        valid_count = 0
+    for seg, valid_count in zip(segments, valid_counts):
         total_count = len(seg.strip())
         if total_count == 0:
             continue
-        for char in seg:
-            o = ord(char)
-            if (0x4E00 <= o <= 0x9FFF) or (ord("a") <= o <= ord("z") or ord("A") <= o <= ord("Z")) or (
-                ord("0") <= o <= ord("9")
-            ):
-                valid_count += 1
         if valid_count / total_count >= 0.3:
             clean_segments.append(seg)
     return "".join(clean_segments)
 
 
 
+def _strip_garbage_symbols(text):
+    text = re.sub(r"[\u25A0-\u25FF\u2610-\u2612]", "", text)
+    return re.sub(r"[⯁-⯿]", "", text)
+
+
+def _valid_runs(text):
+    """连续有效字符段的 [start, end) 边界数组"""
+    edges = np.zeros(len(text) + 2, dtype=np.int8)
+    edges[1:-1] = classify_chars(text) != 0
+    diff = np.diff(edges)
+    return np.flatnonzero(diff == 1), np.flatnonzero(diff == -1)
+
+
+def _join_runs(text, starts, ends):
+    return "".join([text[s:e] for s, e in zip(starts.tolist(), ends.tolist())])
+
+
+
 def remove_garbage_chars(text):
     """严格过滤乱码，保留核心字符"""
-    text = re.sub(r"[\u25A0-\u25FF\u2610-\u2612]", "", text)
-    text = re.sub(r"[⯁-⯿]", "", text)
-
-    chinese_range = range(0x4E00, 0x9FFF + 1)
-    english_lower = set(range(ord("a"), ord("z") + 1))
-    english_upper = set(range(ord("A"), ord("Z") + 1))
-    english_range = english_lower | english_upper
-    number_range = set(range(ord("0"), ord("9") + 1))
-    core_punct = {" ", "。", "！", "？", "；", ",", "."}
-
-    char_flags = []
-    for char in text:
-        o = ord(char)
-        is_valid = o in chinese_range or o in english_range or o in number_range or char in core_punct
-        char_flags.append(is_valid)
-
-    clean_chars = []
-    valid_segment = []
-    for char, is_valid in zip(text, char_flags):
-        if is_valid:
-            valid_segment.append(char)
-        else:
-            if len(valid_segment) >= 2:
-                clean_chars.extend(valid_segment)
-            valid_segment = []
-    if len(valid_segment) >= 2:
-        clean_chars.extend(valid_segment)
-
-    clean_text = "".join(clean_chars)
-    return clean_text
+    text = _strip_garbage_symbols(text)
 
+    # 保留长度 >= 2 的连续有效字符段
+    starts, ends = _valid_runs(text)
+    keep = ends - starts >= 2
 
+    clean_text = _join_runs(text, starts[keep], ends[keep])
+    return clean_text
 
-def load_custom_stopwords():
-    """加载停用词集合（中文+自定义英文停用词）"""
-    stop_words = set()
-    cn_stopwords_path = Path(__file__).parent / "campus\stopwords.txt"
-    if cn_stopwords_path.exists():
-        with open(cn_stopwords_path, "r", encoding="utf-8") as f:
-            cn_stop = set([line.strip() for line in f.readlines() if line.strip()])
-            stop_words.update(cn_stop)
 
-    en_stopwords_path = Path(__file__).parent / "en_stopwords.txt"
-    if en_stopwords_path.exists():
-        with open(en_stopwords_path, "r", encoding="utf-8") as f:
-            en_stop = set([line.strip().lower() for line in f.readlines() if line.strip()])
-            stop_words.update(en_stop)
 
-    domain_generic_words = {
+DOMAIN_GENERIC_WORDS = frozenset(
+    {
         "方法",
         "对象",
         "线程",
@@ -130,8 +145,15 @@ def load_custom_stopwords():
         "用户",
         "需求",
     }
-    stop_words.update(domain_generic_words)
-    return stop_words
+)
+
+_PUNCT_STOPWORDS = frozenset(string.punctuation)
+
+
+
+def load_custom_stopwords(extra=frozenset()):
+    """停用词集合（中文+自定义英文停用词+领域通用词），进程内共享的 frozenset，词表文件变化时自动重载"""
+    return stopword_registry.get_combined(("campus_cn", "campus_en"), DOMAIN_GENERIC_WORDS | frozenset(extra))
 
 
 
@@ -143,10 +165,11 @@ def tokenize_mixed(text):
     tokens = []
     pattern = re.compile(r"([\u4e00-\u9fff]+)|([a-zA-Z]+)|(\d+)")
     matches = pattern.findall(text)
+    cn_tokens = iter(tokenize_many([cn_part for cn_part, _, _ in matches if cn_part]))
 
     for cn_part, en_part, num_part in matches:
         if cn_part:
-            tokens.extend(jieba.lcut(cn_part))
+            tokens.extend(next(cn_tokens))
         elif en_part:
             tokens.append(en_part.lower())
         elif num_part:
@@ -156,20 +179,74 @@ def tokenize_mixed(text):
 
 
 
-def process_text_cleaning(
-    text,
-    lower_case=True,
-    remove_formula=True,
-    num_process="保留",
-    remove_stopwords=True,
-    for_wordcloud=False,
-):
-    """文本清洗主函数（适配词云/章节梳理双场景）"""
-    text = filter_garbage_lines(text)
-    text = re.sub(r"[^\u4e00-\u9fa5a-zA-Z0-9\s。！？；,.%￥]", "", text)
-    text = text.replace("　", " ").replace("\n", " ").replace("\r", " ")
-    text = remove_garbage_chars(text)
+# 流式清洗时每块包含的原始行数
+STREAM_BLOCK_LINES = 256
+# 词云模式下跨块累积到这么多字符再分词：交给分词服务的只有其中的中文片段，
+# 按约一半估计，使每批能达到分词服务的并行阈值、交给进程池处理
+STREAM_TOKENIZE_CHARS = 2 * PARALLEL_MIN_CHARS
+
+_TOKEN_RUN_RE = re.compile(r"[\u4e00-\u9fff]+|[a-zA-Z]+|\d+")
+_SENTENCE_SPLIT_RE = re.compile(r"[。！？；,.]")
+
 
+def _iter_lines(source):
+    if isinstance(source, str):
+        start = 0
+        while True:
+            end = source.find("\n", start)
+            if end < 0:
+                yield source[start:]
+                return
+            yield source[start:end]
+            start = end + 1
+    else:
+        for chunk in source:
+            yield from chunk.split("\n")
+
+
+def _iter_line_blocks(source, block_lines):
+    block = []
+    for line in _iter_lines(source):
+        block.append(line)
+        if len(block) >= block_lines:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _iter_clean_blocks(source, lower_case, remove_formula, num_process, block_lines=STREAM_BLOCK_LINES):
+    """逐块执行清洗的字符级步骤，产出片段依次相接即为整段清洗结果（切句/分词之前）。
+    跨块的有效字符段：已满 2 个字符的直接输出并记为未闭合，不足 2 个的（至多 1 个字符）留待与下一块拼接再判定，
+    最后一块之后仍不足 2 个的丢弃"""
+    has_lines = False
+    carry = ""
+    open_run = False
+    for block in _iter_line_blocks(source, block_lines):
+        kept = filter_garbage_lines("\n".join(block))
+        if not kept:
+            continue
+        piece = ("\n" if has_lines else "") + kept
+        has_lines = True
+        piece = re.sub(r"[^\u4e00-\u9fa5a-zA-Z0-9\s。！？；,.%￥]", "", piece)
+        piece = piece.replace("　", " ").replace("\n", " ").replace("\r", " ")
+
+        buf = carry + _strip_garbage_symbols(piece)
+        starts, ends = _valid_runs(buf)
+        keep = ends - starts >= 2
+        if open_run and len(starts) and starts[0] == 0:
+            keep[0] = True
+        carry = ""
+        open_run = False
+        if len(ends) and ends[-1] == len(buf):
+            if keep[-1]:
+                open_run = True
+            else:
+                carry = buf[starts[-1] :]
+        yield _finish_clean_piece(_join_runs(buf, starts[keep], ends[keep]), lower_case, remove_formula, num_process)
+
+
+def _finish_clean_piece(text, lower_case, remove_formula, num_process):
     if lower_case:
         text = text.lower()
 
@@ -179,16 +256,85 @@ def process_text_cleaning(
 
     if num_process == "去除":
         text = re.sub(r"\d+", "", text)
+    return text
+
+
+def _iter_words(pieces, remove_stopwords, batch_chars=STREAM_TOKENIZE_CHARS):
+    all_stop = load_custom_stopwords(_PUNCT_STOPWORDS) if remove_stopwords else None
+    parts = []
+    size = 0
+    for piece in pieces:
+        parts.append(piece)
+        size += len(piece)
+        if size < batch_chars:
+            continue
+        buf = "".join(parts)
+        # 末尾的中文/英文/数字连续段可能延续到下一块，留待拼接后再分词
+        last = None
+        for last in _TOKEN_RUN_RE.finditer(buf):
+            pass
+        cut = last.start() if last is not None and last.end() == len(buf) else len(buf)
+        parts = [buf[cut:]]
+        size = len(parts[0])
+        yield from _filter_words(tokenize_mixed(buf[:cut]), all_stop)
+    yield from _filter_words(tokenize_mixed("".join(parts)), all_stop)
+
+
+def _filter_words(words, all_stop):
+    for word in words:
+        word = word.strip()
+        if not word:
+            continue
+        if all_stop is not None and (word in all_stop or len(word) <= 1):
+            continue
+        yield word
+
+
+def _iter_sentences(pieces):
+    pending = ""
+    for piece in pieces:
+        parts = _SENTENCE_SPLIT_RE.split(pending + re.sub(r"\s+", "", piece))
+        pending = parts.pop()
+        for s in parts:
+            if len(s.strip()) >= 5:
+                yield s.strip() + "。"
+    if len(pending.strip()) >= 5:
+        yield pending.strip() + "。"
+
 
+
+def iter_text_cleaning(
+    source,
+    lower_case=True,
+    remove_formula=True,
+    num_process="保留",
+    remove_stopwords=True,
+    for_wordcloud=False,
+    block_lines=STREAM_BLOCK_LINES,
+):
+    """流式文本清洗：source 为整段文本或按 "\n" 相连的文本块迭代器（如 file_utils.iter_file_units 的各单元文本），
+    逐块处理、内存占用与块大小相关；for_wordcloud 时逐个产出词，否则逐句产出，结果与 process_text_cleaning 一致"""
+    pieces = _iter_clean_blocks(source, lower_case, remove_formula, num_process, block_lines)
+    if for_wordcloud:
+        return _iter_words(pieces, remove_stopwords)
+    return _iter_sentences(pieces)
+
+
+
+def process_text_cleaning(
+    text,
+    lower_case=True,
+    remove_formula=True,
+    num_process="保留",
+    remove_stopwords=True,
+    for_wordcloud=False,
+):
+    """文本清洗主函数（适配词云/章节梳理双场景）；text 也可以是按 "\n" 相连的文本块迭代器（如 file_utils.iter_csv_rows）"""
     if for_wordcloud:
-        words = tokenize_mixed(text)
-        words = [word.strip() for word in words if word.strip()]
-        if remove_stopwords:
-            all_stop = load_custom_stopwords()
-            all_stop |= set(string.punctuation)
-            words = [word for word in words if word not in all_stop and len(word) > 1]
+        words = iter_text_cleaning(text, lower_case, remove_formula, num_process, remove_stopwords, for_wordcloud=True)
         return " ".join(words)
     else:
+        text = "".join(_iter_clean_blocks(text, lower_case, remove_formula, num_process))
         text = re.sub(r"\s+", "", text)
         sentences = re.split(r"[。！？；,.]", text)
         sentences = [s.strip() + "。" for s in sentences if len(s.strip()) >= 5]
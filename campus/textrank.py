@@ -0,0 +1,73 @@
+"""TextRank 关键词：在共享词流（带词性的词 id 数组）上构建稀疏共现矩阵，向量化幂迭代求词权重"""
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from .vocab import TAGS
+
+
+# 共现窗口（与 jieba.analyse.textrank 相同：当前词与其后 span - 1 个位置内的词共现）
+SPAN = 5
+DAMPING = 0.85
+MAX_ITER = 100
+TOL = 1e-6
+
+
+def cooccurrence_matrix(ids, keep, span=SPAN):
+    """窗口共现计数的对称稀疏矩阵（按出现过的节点压缩编号），返回 (矩阵, 节点对应的词 id)。
+    ids 为词 id 数组，keep 为参与构图的位置掩码；被过滤的位置仍占窗口"""
+    src_parts = []
+    dst_parts = []
+    for d in range(1, span):
+        if d >= len(ids):
+            break
+        both = keep[:-d] & keep[d:]
+        src_parts.append(ids[:-d][both])
+        dst_parts.append(ids[d:][both])
+    src = np.concatenate(src_parts) if src_parts else np.zeros(0, dtype=np.uint32)
+    dst = np.concatenate(dst_parts) if dst_parts else np.zeros(0, dtype=np.uint32)
+
+    nodes, inverse = np.unique(np.concatenate([src, dst]), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n = len(nodes)
+    rows = np.concatenate([inverse[: len(src)], inverse[len(src):]])
+    cols = np.concatenate([inverse[len(src):], inverse[: len(src)]])
+    matrix = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n)).tocsr()
+    matrix.sum_duplicates()
+    return matrix, nodes
+
+
+def rank(matrix, damping=DAMPING, max_iter=MAX_ITER, tol=TOL):
+    """加权 PageRank 幂迭代，结果按 jieba 的方式归一化到 (0, 1]。matrix 为对称权重矩阵，无边的孤立节点只得基础分"""
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_sum = np.asarray(matrix.sum(axis=1)).ravel()
+    # 第 m 列除以节点 m 的出边权重和，每步即 ws = (1 - d) + d * M @ ws
+    inv_out = np.divide(1.0, out_sum, out=np.zeros(n), where=out_sum > 0)
+    transition = matrix.multiply(inv_out).tocsr()
+    ws = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new = (1 - damping) + damping * (transition @ ws)
+        if np.abs(new - ws).max() < tol:
+            ws = new
+            break
+        ws = new
+    min_rank, max_rank = ws.min(), ws.max()
+    return (ws - min_rank / 10.0) / (max_rank - min_rank / 10.0)
+
+
+def rank_tokens(vocab, ids, tags, allow_pos=("ns", "n", "vn", "v"), stopwords=frozenset(), top_k=20, span=SPAN):
+    """在词 id / 词性 id 数组（如 tokenizer="posseg" 的文档分析产物）上提取 TextRank 关键词，返回按权重降序的
+    [(词, 权重), ...]。参与构图的词需满足：词性在 allow_pos 内、长度 >= 2、不是停用词"""
+    if not len(ids):
+        return []
+    keep = TAGS.mask(frozenset(allow_pos))[tags]
+    keep &= vocab.lengths()[ids] >= 2
+    keep &= ~vocab.mask(stopwords)[ids]
+
+    matrix, nodes = cooccurrence_matrix(ids, keep, span)
+    weights = rank(matrix)
+    order = np.argsort(-weights, kind="stable")
+    if top_k:
+        order = order[:top_k]
+    return list(zip(vocab.words(nodes[order]), weights[order].tolist()))
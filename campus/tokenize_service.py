@@ -0,0 +1,70 @@
+"""分词服务：批量分词接口；输入较大时分批分发到预加载 jieba 词典的进程池，结果保持输入顺序"""
+import os
+from functools import partial
+from concurrent.futures.process import BrokenProcessPool
+
+import jieba
+import jieba.posseg
+
+from . import jieba_dict, parallel
+
+
+# 批量总字符数低于该值时直接在当前线程分词（进程间传输的开销不划算）
+PARALLEL_MIN_CHARS = int(os.getenv("CAMPUS_TOKENIZE_PARALLEL_MIN_CHARS", "200000"))
+TOKENIZE_MAX_WORKERS = int(os.getenv("CAMPUS_TOKENIZE_WORKERS", "4"))
+# 每个子任务大约携带的字符数
+_BATCH_CHARS = 40000
+
+
+def jieba_lcut(text):
+    """默认分词函数（模块级函数，可按引用传给工作进程）"""
+    return jieba.lcut(text)
+
+
+def posseg_lcut(text):
+    """带词性的分词，返回 [(词, 词性), ...]（模块级函数，可按引用传给工作进程）"""
+    return [(p.word, p.flag) for p in jieba.posseg.lcut(text)]
+
+
+def _init_worker():
+    if not jieba_dict.load():
+        jieba.initialize()
+
+
+def _tokenize_batch(tokenizer, texts):
+    return [tokenizer(t) for t in texts]
+
+
+def _batches(texts, batch_chars):
+    batch = []
+    size = 0
+    for text in texts:
+        batch.append(text)
+        size += len(text)
+        if size >= batch_chars:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def _pool():
+    return parallel.shared_pool("tokenize", TOKENIZE_MAX_WORKERS, initializer=_init_worker)
+
+
+def tokenize_many(texts, tokenizer=jieba_lcut, min_parallel_chars=None):
+    """批量分词，返回与 texts 一一对应的词列表；tokenizer 须为模块级函数。
+    小批量、或已在工作进程内时直接在当前线程完成"""
+    texts = list(texts)
+    jieba_dict.load()
+    threshold = PARALLEL_MIN_CHARS if min_parallel_chars is None else min_parallel_chars
+    if len(texts) < 2 or parallel.in_worker() or sum(map(len, texts)) < threshold:
+        return [tokenizer(t) for t in texts]
+
+    try:
+        results = _pool().map(partial(_tokenize_batch, tokenizer), _batches(texts, _BATCH_CHARS))
+        return [tokens for batch in results for tokens in batch]
+    except BrokenProcessPool:
+        parallel.discard_pool("tokenize")
+        return [tokenizer(t) for t in texts]
@@ -0,0 +1,130 @@
+"""词表：进程内共享的词 <-> 整数 id 映射。词流存为 uint32 数组，停用词等集合预先标记为布尔掩码，
+过滤、计数、共现统计都可直接在整数数组上完成。词表超过上限后换用新词表，旧词表随引用它的分析产物一起释放"""
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+
+# 当前词表的词数上限，超过后新的分析产物改用新词表（id 重新编号）
+VOCAB_MAX_WORDS = int(os.getenv("CAMPUS_VOCAB_MAX_WORDS", "500000"))
+# 每个词表缓存的集合掩码数量（按最近使用淘汰，停用词表被替换后旧掩码随之淘汰）
+MASK_CACHE_SIZE = 8
+
+
+class Vocabulary:
+    """只增不删的词表，id 按首次出现顺序分配，在同一词表内稳定"""
+
+    def __init__(self):
+        self._ids = {}
+        self._words = []
+        self._lengths = array("I")
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._words)
+
+    def _add(self, word):
+        with self._lock:
+            i = self._ids.get(word)
+            if i is None:
+                i = len(self._words)
+                self._words.append(word)
+                self._lengths.append(len(word))
+                self._ids[word] = i
+            return i
+
+    def get_id(self, word, default=None):
+        return self._ids.get(word, default)
+
+    def intern(self, word):
+        i = self._ids.get(word)
+        return self._add(word) if i is None else i
+
+    def encode(self, tokens):
+        """词序列 -> uint32 id 数组（新词即时登记）"""
+        get = self._ids.get
+        ids = array("I")
+        for word in tokens:
+            i = get(word)
+            ids.append(self._add(word) if i is None else i)
+        return np.frombuffer(ids, dtype=np.uint32) if ids else np.zeros(0, dtype=np.uint32)
+
+    def word(self, i):
+        return self._words[i]
+
+    def words(self, ids):
+        """id 数组 -> 词列表"""
+        words = self._words
+        return [words[i] for i in np.asarray(ids).tolist()]
+
+    def lengths(self):
+        """各 id 对应词的字符数（下标即 id）"""
+        with self._lock:
+            return np.array(self._lengths, dtype=np.uint32)
+
+    def mask(self, words):
+        """长度为 len(self) 的布尔数组，属于 words 的 id 为 True。
+        按集合缓存，词表增长后只补查新增的词"""
+        key = words if isinstance(words, frozenset) else frozenset(words)
+        n = len(self._words)
+        with self._lock:
+            cached = self._masks.get(key)
+            if cached is not None and len(cached) == n:
+                self._masks.move_to_end(key)
+                return cached
+        start = 0 if cached is None else len(cached)
+        mask = np.zeros(n, dtype=bool)
+        if start:
+            mask[:start] = cached
+        new_words = self._words[start:n]
+        if len(key) < len(new_words):
+            ids = [self._ids[w] for w in key if self._ids.get(w, n) < n]
+            mask[[i for i in ids if i >= start]] = True
+        else:
+            mask[start:] = [w in key for w in new_words]
+        with self._lock:
+            self._masks[key] = mask
+            self._masks.move_to_end(key)
+            while len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+
+_current = Vocabulary()
+_current_lock = threading.Lock()
+
+
+def current_vocab():
+    """新的分析产物使用的词表：同一代内所有产物共用一套 id，超过 VOCAB_MAX_WORDS 个词时换代"""
+    global _current
+    with _current_lock:
+        if len(_current) > VOCAB_MAX_WORDS:
+            _current = Vocabulary()
+        return _current
+
+
+def remap(ids, source, target):
+    """source 中的 id 数组换算为 target 中的 id（合并不同代词表的产物时使用）"""
+    if source is target or not len(ids):
+        return ids
+    uniq, inverse = np.unique(ids, return_inverse=True)
+    return target.encode(source.words(uniq))[inverse.reshape(-1)]
+
+
+def concat_ids(parts):
+    """按顺序拼接多段 (id 数组, 词表)，返回 (id 数组, 词表)；各段词表不同时统一换算到当前词表"""
+    parts = list(parts)
+    if not parts:
+        return np.zeros(0, dtype=np.uint32), current_vocab()
+    vocab = parts[0][1]
+    if any(v is not vocab for _, v in parts):
+        vocab = current_vocab()
+    return np.concatenate([remap(ids, v, vocab) for ids, v in parts]), vocab
+
+
+# 词性标记表（jieba.posseg 的 flag 及 eng / m），标记种类固定，全进程共用
+TAGS = Vocabulary()
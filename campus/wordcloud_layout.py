@@ -0,0 +1,169 @@
+"""词云快速排版：在降采样的占用网格上放置词语，坐标按网格边长放大回原画布。
+
+放置规则与 WordCloud.generate_from_frequencies 相同（字号按相对词频递减、优先横排、放不下先换方向再缩小字号），
+产出同格式的 layout_，绘制仍由 WordCloud.to_image 完成。字体对象与字形占用按 (字体, 字号) 缓存复用。
+"""
+import os
+from functools import lru_cache
+from operator import itemgetter
+from random import Random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+# 占用网格的边长（像素）；越大越快，词间空隙也越大
+GRID_CELL = int(os.getenv("CAMPUS_WORDCLOUD_GRID_CELL", "4"))
+
+_MEASURE = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+
+@lru_cache(maxsize=256)
+def _font(font_path, font_size):
+    return ImageFont.truetype(font_path, font_size)
+
+
+def _transposed(font_path, font_size, orientation):
+    return ImageFont.TransposedFont(_font(font_path, font_size), orientation=orientation)
+
+
+@lru_cache(maxsize=16384)
+def _glyph(font_path, font_size, orientation, word, cell, margin):
+    """词在指定字体、字号、方向下的网格占用：返回 (行数, 列数, 网格掩码)。
+    掩码由实际笔画像素按网格最大池化得到，外框含 margin"""
+    font = _transposed(font_path, font_size, orientation)
+    left, top, right, bottom = _MEASURE.textbbox((0, 0), word, font=font)
+    width, height = max(right, 1), max(bottom, 1)
+    img = Image.new("L", (width, height))
+    ImageDraw.Draw(img).text((0, 0), word, fill=255, font=font)
+
+    rows = -(-(height + margin) // cell)
+    cols = -(-(width + margin) // cell)
+    pixels = np.zeros((rows * cell, cols * cell), dtype=bool)
+    pixels[:height, :width] = np.asarray(img) > 0
+    grid = pixels.reshape(rows, cell, cols, cell).any(axis=(1, 3))
+    return rows, cols, grid
+
+
+class _OccupancyGrid:
+    def __init__(self, height, width, cell):
+        self.cell = cell
+        self.grid = np.zeros((height // cell, width // cell), dtype=bool)
+        self._table = None
+
+    def _summed_area(self):
+        if self._table is None:
+            table = np.zeros((self.grid.shape[0] + 1, self.grid.shape[1] + 1), dtype=np.int32)
+            np.cumsum(np.cumsum(self.grid, axis=0, dtype=np.int32), axis=1, out=table[1:, 1:])
+            self._table = table
+        return self._table
+
+    def sample(self, rows, cols, random_state):
+        """随机取一个 rows x cols 全空的网格位置（左上角），没有则返回 None"""
+        n_rows, n_cols = self.grid.shape
+        if rows > n_rows or cols > n_cols:
+            return None
+        t = self._summed_area()
+        window = t[rows:, cols:] - t[:-rows, cols:] - t[rows:, :-cols] + t[:-rows, :-cols]
+        free = np.flatnonzero(window == 0)
+        if not len(free):
+            return None
+        k = int(free[random_state.randint(0, len(free) - 1)])
+        return divmod(k, window.shape[1])
+
+    def place(self, i, j, glyph):
+        rows, cols = glyph.shape
+        self.grid[i : i + rows, j : j + cols] |= glyph
+        self._table = None
+
+
+def _layout(wc, frequencies, font_size, random_state, cell):
+    height, width = wc.height, wc.width
+    occupancy = _OccupancyGrid(height, width, cell)
+    margin = wc.margin
+    font_sizes, positions, orientations, colors = [], [], [], []
+    last_freq = 1.0
+    rs = wc.relative_scaling
+    placed = []
+
+    def fits(size, orientation):
+        rows, cols, glyph = _glyph(wc.font_path, size, orientation, word, cell, margin)
+        pos = occupancy.sample(rows, cols, random_state)
+        return (pos, glyph) if pos is not None else None
+
+    for word, freq in frequencies:
+        if freq == 0:
+            continue
+        if rs != 0:
+            font_size = int(round((rs * (freq / float(last_freq)) + (1 - rs)) * font_size))
+        orientation = None if random_state.random() < wc.prefer_horizontal else Image.ROTATE_90
+
+        found = None
+        if font_size >= wc.min_font_size:
+            found = fits(font_size, orientation)
+            if found is None and wc.prefer_horizontal < 1:
+                orientation = Image.ROTATE_90
+                found = fits(font_size, orientation)
+            if found is None:
+                # 放不下时横排逐步缩小字号；占用随字号单调，二分找出能放下的最大字号
+                orientation = None
+                lo, hi = wc.min_font_size, font_size - 1
+                while lo <= hi:
+                    mid = (lo + hi) // 2
+                    if fits(mid, None) is not None:
+                        lo = mid + 1
+                    else:
+                        hi = mid - 1
+                font_size = hi
+                if font_size >= wc.min_font_size:
+                    found = fits(font_size, None)
+        if found is None:
+            break
+
+        (i, j), glyph = found
+        occupancy.place(i, j, glyph)
+        x, y = i * cell + margin // 2, j * cell + margin // 2
+        positions.append((x, y))
+        orientations.append(orientation)
+        font_sizes.append(font_size)
+        colors.append(
+            wc.color_func(
+                word,
+                font_size=font_size,
+                position=(x, y),
+                orientation=orientation,
+                random_state=random_state,
+                font_path=wc.font_path,
+            )
+        )
+        placed.append((word, freq))
+        last_freq = freq
+
+    return list(zip(placed, font_sizes, positions, orientations, colors))
+
+
+def generate(wc, frequencies, cell=None):
+    """在 WordCloud 实例上用网格排版生成布局（等价于 wc.generate_from_frequencies），返回 wc"""
+    cell = cell or GRID_CELL
+    frequencies = sorted(frequencies.items(), key=itemgetter(1), reverse=True)
+    if len(frequencies) <= 0:
+        raise ValueError("We need at least 1 word to plot a word cloud, got 0.")
+    frequencies = frequencies[: wc.max_words]
+    max_frequency = float(frequencies[0][1])
+    frequencies = [(word, freq / max_frequency) for word, freq in frequencies]
+    random_state = wc.random_state if wc.random_state is not None else Random()
+
+    if wc.max_font_size is not None:
+        font_size = wc.max_font_size
+    elif len(frequencies) == 1:
+        font_size = wc.height
+    else:
+        # 与 WordCloud 相同：先以画布高度为最大字号排前两个词，取其字号的调和平均
+        sizes = [x[1] for x in _layout(wc, frequencies[:2], wc.height, random_state, cell)]
+        if not sizes:
+            raise ValueError("Couldn't find space to draw. Either the Canvas size is too small or too much of the image is masked out.")
+        font_size = int(2 * sizes[0] * sizes[1] / (sizes[0] + sizes[1])) if len(sizes) > 1 else sizes[0]
+
+    wc.words_ = dict(frequencies)
+    wc.layout_ = _layout(wc, frequencies, font_size, random_state, cell)
+    return wc
@@ -1,12 +1,105 @@
 """词云生成工具：基于TF-IDF/TextRank权重生成词云"""
+import os
+import hashlib
+import threading
 import warnings
+from io import BytesIO
+from collections import OrderedDict
 warnings.filterwarnings("ignore", message="The use_column_width parameter has been deprecated")
 import numpy as np
-import jieba.analyse
-import matplotlib.pyplot as plt
 from wordcloud import WordCloud
-from sklearn.feature_extraction.text import TfidfVectorizer
-from .text_cleaner import tokenize_mixed, load_custom_stopwords
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.preprocessing import normalize
+from .text_cleaner import load_custom_stopwords
+from .doc_analysis import analyze_text
+from . import jieba_dict, parallel, textrank, wordcloud_layout
+
+
+FONT_PATH = os.getenv("CAMPUS_WORDCLOUD_FONT", "/home/user/ljl/nlp/aid_integrated/c1218/resources/STKAITI.TTF")
+WORDCLOUD_WIDTH = 800
+WORDCLOUD_HEIGHT = 600
+# 直接出图时的放大倍数（相当于原先 180 dpi 导出的清晰度）
+WORDCLOUD_SCALE = 2
+# 进程内缓存的词云图片数量（按最近使用淘汰）
+RENDER_CACHE_SIZE = int(os.getenv("CAMPUS_WORDCLOUD_CACHE_SIZE", "64"))
+# 词云并发渲染的进程数上限（进程池全局共享，再受 parallel.MAX_WORKERS 约束）
+RENDER_MAX_WORKERS = int(os.getenv("CAMPUS_WORDCLOUD_WORKERS", "4"))
+
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+
+class _ContainmentIndex:
+    """已保留词的包含关系索引。
+
+    以广义后缀自动机收录已保留词，O(|w|) 判断 w 是否为其中某词的子串；
+    另按长度分组的哈希集合判断 w 是否包含某个已保留词。
+    """
+
+    def __init__(self):
+        self._next = [{}]
+        self._link = [-1]
+        self._len = [0]
+        self._words = set()
+        self._lengths = set()
+
+    def _new_state(self, length, link, trans=None):
+        self._next.append({} if trans is None else dict(trans))
+        self._link.append(link)
+        self._len.append(length)
+        return len(self._next) - 1
+
+    def _clone(self, p, q, c):
+        nxt, link = self._next, self._link
+        clone = self._new_state(self._len[p] + 1, link[q], nxt[q])
+        while p != -1 and nxt[p].get(c) == q:
+            nxt[p][c] = clone
+            p = link[p]
+        link[q] = clone
+        return clone
+
+    def _extend(self, last, c):
+        nxt, link, length = self._next, self._link, self._len
+        q = nxt[last].get(c)
+        if q is not None:
+            # 该转移已由其他词建立：必要时拆出克隆状态
+            return q if length[q] == length[last] + 1 else self._clone(last, q, c)
+        cur = self._new_state(length[last] + 1, 0)
+        p = last
+        while p != -1 and c not in nxt[p]:
+            nxt[p][c] = cur
+            p = link[p]
+        if p != -1:
+            q = nxt[p][c]
+            link[cur] = q if length[p] + 1 == length[q] else self._clone(p, q, c)
+        return cur
+
+    def add(self, word):
+        last = 0
+        for c in word:
+            last = self._extend(last, c)
+        self._words.add(word)
+        self._lengths.add(len(word))
+
+    def is_substring(self, word):
+        """word 是否为某个已保留词的子串"""
+        nxt = self._next
+        state = 0
+        for c in word:
+            state = nxt[state].get(c)
+            if state is None:
+                return False
+        return True
+
+    def contains_reserved(self, word):
+        """word 是否包含某个已保留词"""
+        n = len(word)
+        for k in self._lengths:
+            for i in range(n - k + 1):
+                if word[i : i + k] in self._words:
+                    return True
+        return False
 
 
 def filter_duplicate_words(word2weight):
@@ -15,31 +108,22 @@ def filter_duplicate_words(word2weight):
         return {}
     sorted_words = sorted(word2weight.items(), key=lambda x: (len(x[0]), x[1]), reverse=True)
     filtered = {}
-    reserved_words = set()
+    # 按长度降序处理，已保留词都不短于当前词：只需判断当前词是否为某个已保留词的子串
+    reserved = _ContainmentIndex()
     for word, weight in sorted_words:
         if len(word) < 2:
             continue
-        is_duplicate = False
-        for reserved in reserved_words:
-            if word in reserved or reserved in word:
-                is_duplicate = True
-                break
-        if not is_duplicate:
+        if not reserved.is_substring(word):
             filtered[word] = weight
-            reserved_words.add(word)
+            reserved.add(word)
     if len(filtered) < 20 and len(word2weight) >= 20:
         top_words = sorted(word2weight.items(), key=lambda x: x[1], reverse=True)[:30]
         top_filtered = {}
-        top_reserved = set()
+        top_reserved = _ContainmentIndex()
         for word, weight in top_words:
             if len(word) < 2:
                 continue
-            is_dup = False
-            for reserved in top_reserved:
-                if word in reserved or reserved in word:
-                    is_dup = True
-                    break
-            if not is_dup:
+            if not (top_reserved.is_substring(word) or top_reserved.contains_reserved(word)):
                 top_filtered[word] = weight
                 top_reserved.add(word)
                 if len(top_filtered) >= 20:
@@ -49,47 +133,170 @@ def filter_duplicate_words(word2weight):
 
 
 
+# TF-IDF 参数：每 8 个词为一篇伪文档，统计 2~3 元词组
+TFIDF_DOC_WORDS = 8
+TFIDF_NGRAM_RANGE = (2, 3)
+TFIDF_MIN_DF = 2
+TFIDF_MAX_DF = 0.8
+TFIDF_MAX_FEATURES = 500
+
+
+def _ngram_count_matrix(ids, doc_of, n_docs, vocab, ngram_range=TFIDF_NGRAM_RANGE):
+    """在词 id 数组上统计各伪文档的 n 元词组词频（词组不跨伪文档）。
+    返回 (计数矩阵, 特征名列表)，特征按名称字典序排列，与 TfidfVectorizer 一致"""
+    rows = []
+    cols = []
+    names = []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        starts = np.arange(max(len(ids) - n + 1, 0))
+        starts = starts[doc_of[starts] == doc_of[starts + n - 1]]
+        if not len(starts):
+            continue
+        grams = np.stack([ids[starts + k] for k in range(n)], axis=1)
+        uniq, inverse = np.unique(grams, axis=0, return_inverse=True)
+        words = vocab.words(uniq.ravel())
+        rows.append(doc_of[starts])
+        cols.append(inverse.reshape(-1) + len(names))
+        names.extend(" ".join(words[i : i + n]) for i in range(0, len(words), n))
+
+    order = sorted(range(len(names)), key=names.__getitem__)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    cols = rank[np.concatenate(cols)] if cols else np.zeros(0, dtype=np.int64)
+    counts = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_docs, len(names)))
+    counts.sum_duplicates()
+    return counts, [names[i] for i in order]
+
+
+
+def _clean_token_ids(text, custom_stop):
+    """清洗文本的词 id 序列，去停用词与单字"""
+    analysis = analyze_text(text)
+    vocab, ids = analysis.vocab, analysis.token_ids
+    return ids[~vocab.mask(custom_stop)[ids] & (vocab.lengths()[ids] >= 2)], vocab
+
+
+def tfidf_token_ids(text):
+    """TF-IDF 使用的 (词 id 序列, 词表)（去停用词与单字）。各章节的序列按顺序拼接（vocab.concat_ids）即为合并文本的序列"""
+    return _clean_token_ids(str(text), load_custom_stopwords())
+
+
+def _kept_features(counts, n_docs):
+    """按 min_df / max_df / max_features 剪枝（规则同 TfidfVectorizer），返回保留的列下标"""
+    dfs = np.bincount(counts.indices, minlength=counts.shape[1])
+    mask = (dfs <= n_docs * TFIDF_MAX_DF) & (dfs >= TFIDF_MIN_DF)
+    if mask.sum() > TFIDF_MAX_FEATURES:
+        tfs = np.asarray(counts.sum(axis=0)).ravel()
+        top = np.flatnonzero(mask)[(-tfs[mask]).argsort()[:TFIDF_MAX_FEATURES]]
+        mask = np.zeros(len(dfs), dtype=bool)
+        mask[top] = True
+    return np.flatnonzero(mask)
+
+
+def _to_word2weight(names, kept, weights):
+    word2weight = {names[k]: w for k, w in zip(kept.tolist(), weights) if w > 0.001}
+    return filter_duplicate_words(word2weight)
+
+
 def get_tfidf_weights(text):
     """计算TF-IDF权重"""
-    custom_stop = load_custom_stopwords()
-    vectorizer = TfidfVectorizer(
-        tokenizer=tokenize_mixed,
-        stop_words=list(custom_stop),
-        ngram_range=(2, 3),
-        min_df=2,
-        max_df=0.8,
-        max_features=500,
-    )
-    clean_words = [w for w in tokenize_mixed(text) if len(w) >= 2 and w not in custom_stop]
-    if len(clean_words) < 5:
-        pseudo_docs = [text]
-    else:
-        pseudo_docs = [" ".join(clean_words[i : i + 8]) for i in range(0, len(clean_words), 8)]
+    return tfidf_weights_from_ids(*tfidf_token_ids(text))
+
+
+def tfidf_weights_from_ids(ids, vocab):
+    """由 tfidf_token_ids 的结果（可为多个章节拼接）计算 TF-IDF 权重，规则同 get_tfidf_weights"""
+    doc_of = np.arange(len(ids)) // TFIDF_DOC_WORDS
+    n_docs = int(doc_of[-1]) + 1 if len(ids) else 0
+    # 有效词不足时整篇只成一篇伪文档，min_df / max_df 无法同时满足
+    if len(ids) < 5 or n_docs * TFIDF_MAX_DF < TFIDF_MIN_DF:
+        return {}
     try:
-        tfidf_matrix = vectorizer.fit_transform(pseudo_docs)
-        weights = tfidf_matrix.sum(axis=0).A1
-        word2weight = dict(zip(vectorizer.get_feature_names_out(), weights))
-        word2weight = {k: v for k, v in word2weight.items() if v > 0.001}
-        word2weight = filter_duplicate_words(word2weight)
-        return word2weight
+        counts, names = _ngram_count_matrix(ids, doc_of, n_docs, vocab)
+        kept = _kept_features(counts, n_docs)
+        if not len(kept):
+            return {}
+        weights = TfidfTransformer().fit_transform(counts[:, kept]).sum(axis=0).A1
+        return _to_word2weight(names, kept, weights)
     except Exception:
         return {}
 
 
 
+def chapter_ngram_stats(text):
+    """单个章节的 n 元词组统计：(有效词数, 伪文档数, 伪文档 x 词组计数矩阵, 词组名列表)，供语料级 TF-IDF 合并"""
+    ids, vocab = tfidf_token_ids(text)
+    n_docs = -(-len(ids) // TFIDF_DOC_WORDS)
+    doc_of = np.arange(len(ids)) // TFIDF_DOC_WORDS
+    counts, names = _ngram_count_matrix(ids, doc_of, n_docs, vocab)
+    return len(ids), n_docs, counts, names
+
+
+def corpus_tfidf_from_stats(chapter_stats):
+    """语料级 TF-IDF：由各章节的 chapter_ngram_stats（{章节名: 统计}）合并计算，IDF 按章节计算
+    （词组出现的章节越少权重越高），返回 {章节名: 词权重}；伪文档划分与剪枝规则与 get_tfidf_weights 相同（在章节内进行）"""
+    names_order = list(chapter_stats)
+    results = {name: {} for name in names_order}
+    try:
+        # 各章节词组映射到全语料词组表（按名称排序，与整体统计时的列顺序一致），统计章节级文档频率
+        all_names = np.array(sorted(set().union(*(stats[3] for stats in chapter_stats.values()))), dtype=object)
+        if not len(all_names):
+            return results
+        df = np.zeros(len(all_names), dtype=np.int64)
+        columns = {}
+        for name in names_order:
+            own = chapter_stats[name][3]
+            columns[name] = np.searchsorted(all_names, np.array(own, dtype=object)) if own else np.zeros(0, dtype=np.int64)
+            df[columns[name]] += 1
+        idf = np.log((1 + len(names_order)) / (1 + df)) + 1
+    except Exception:
+        return results
+
+    for name in names_order:
+        n_tokens, n_docs, counts, ngram_names = chapter_stats[name]
+        if n_tokens < 5 or n_docs * TFIDF_MAX_DF < TFIDF_MIN_DF:
+            continue
+        try:
+            kept = _kept_features(counts, n_docs)
+            if not len(kept):
+                continue
+            tfidf = normalize(counts[:, kept].multiply(idf[columns[name][kept]]).tocsr())
+            results[name] = _to_word2weight(ngram_names, kept, np.asarray(tfidf.sum(axis=0)).ravel())
+        except Exception:
+            continue
+    return results
+
+
+
 def get_textrank_weights(text):
     """计算TextRank权重"""
     try:
-        textrank_result = jieba.analyse.textrank(
-            text,
-            topK=200,
-            withWeight=True,
-            allowPOS=("n", "vn", "adj"),
-            withFlag=True,
-        )
+        return textrank_weights_from_stream(*textrank_token_stream(text))
+    except Exception:
+        return {}
+
+
+def textrank_token_stream(text):
+    """TextRank 使用的带词性词流 (词 id 数组, 词性 id 数组, 词表)。各章节的词流按顺序拼接即为合并文本的词流"""
+    jieba_dict.load()
+    analysis = analyze_text(str(text), tokenizer="posseg")
+    return analysis.token_ids, analysis.tag_ids, analysis.vocab
+
+
+def textrank_weights_from_stream(ids, tag_ids, vocab):
+    """由 textrank_token_stream 的结果（可为多个章节拼接）计算 TextRank 权重，规则同 get_textrank_weights"""
+    try:
         custom_stop = load_custom_stopwords()
+        textrank_result = textrank.rank_tokens(
+            vocab,
+            ids,
+            tag_ids,
+            allow_pos=("n", "vn", "adj"),
+            stopwords=custom_stop,
+            top_k=200,
+        )
         word2weight = {}
-        for (word, flag), score in textrank_result:
+        for word, score in textrank_result:
             if 2 <= len(word) <= 4 and word not in custom_stop and score > 0.01:
                 word2weight[word] = score
         word2weight = filter_duplicate_words(word2weight)
@@ -99,10 +306,7 @@ def get_textrank_weights(text):
 
 
 
-def generate_weighted_wordcloud(word2weight, bg_color="#ffffff", max_words=200):
-    """基于权重生成词云"""
-    if not word2weight:
-        return None
+def _scaled_top_words(word2weight, max_words):
     weights = list(word2weight.values())
     max_w = max(weights) if weights else 1
     min_w = min(weights) if weights else 0
@@ -114,18 +318,126 @@ def generate_weighted_wordcloud(word2weight, bg_color="#ffffff", max_words=200):
             scaled = 100 + 900 * np.sqrt((w - min_w) / (max_w - min_w))
         scaled_weights[word] = scaled
     top_scaled = sorted(scaled_weights.items(), key=lambda x: x[1], reverse=True)[:max_words]
-    top_scaled = dict(top_scaled)
+    return dict(top_scaled)
+
+
+def _build_wordcloud(
+    word2weight, bg_color, max_words, width=WORDCLOUD_WIDTH, height=WORDCLOUD_HEIGHT, scale=1, fast_layout=False
+):
+    top_scaled = _scaled_top_words(word2weight, max_words)
     wc = WordCloud(
         background_color=bg_color,
         max_words=len(top_scaled),
-        width=800,
-        height=600,
-        font_path="/home/user/ljl/nlp/aid_integrated/c1218/resources/STKAITI.TTF",
+        width=width,
+        height=height,
+        scale=scale,
+        font_path=FONT_PATH,
         collocations=False,
         repeat=False,
     )
-    wc.generate_from_frequencies(top_scaled)
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.imshow(wc, interpolation="bilinear")
-    ax.axis("off")
-    return fig
+    if fast_layout:
+        wordcloud_layout.generate(wc, top_scaled)
+    else:
+        wc.generate_from_frequencies(top_scaled)
+    return wc
+
+
+def _weights_digest(word2weight):
+    h = hashlib.sha256()
+    for word, w in word2weight.items():
+        h.update(f"{word}\x00{float(w)!r}\x01".encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def _render_key(word2weight, bg_color, max_words, width, height, scale, fmt, fast_layout):
+    return (
+        _weights_digest(word2weight),
+        bg_color,
+        int(max_words),
+        int(width),
+        int(height),
+        scale,
+        fmt.upper(),
+        bool(fast_layout),
+    )
+
+
+def _cache_get(key):
+    with _render_cache_lock:
+        data = _render_cache.get(key)
+        if data is not None:
+            _render_cache.move_to_end(key)
+        return data
+
+
+def _cache_put(key, data):
+    with _render_cache_lock:
+        _render_cache[key] = data
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+
+
+def _render_image(word2weight, bg_color, max_words, width, height, scale, fmt, fast_layout=False):
+    """排版并编码一张词云（不查缓存；模块级函数，可在工作进程中执行）"""
+    wc = _build_wordcloud(word2weight, bg_color, max_words, width, height, scale, fast_layout)
+    buf = BytesIO()
+    wc.to_image().save(buf, format=fmt.upper())
+    return buf.getvalue()
+
+
+def render_wordcloud_image(
+    word2weight,
+    bg_color="#ffffff",
+    max_words=200,
+    width=WORDCLOUD_WIDTH,
+    height=WORDCLOUD_HEIGHT,
+    scale=WORDCLOUD_SCALE,
+    fmt="PNG",
+    fast_layout=False,
+):
+    """生成词云并直接编码为图片字节（PNG / WEBP），不经过 matplotlib。
+    按 (权重摘要, 背景色, 最大词数, 尺寸, 格式, 排版方式) 做进程内 LRU 缓存，相同参数再次生成直接返回"""
+    if not word2weight:
+        return None
+    key = _render_key(word2weight, bg_color, max_words, width, height, scale, fmt, fast_layout)
+    data = _cache_get(key)
+    if data is None:
+        data = _render_image(word2weight, bg_color, max_words, width, height, scale, fmt, fast_layout)
+        _cache_put(key, data)
+    return data
+
+
+def render_wordcloud_images(
+    chapter_weights,
+    bg_color="#ffffff",
+    max_words=200,
+    width=WORDCLOUD_WIDTH,
+    height=WORDCLOUD_HEIGHT,
+    scale=WORDCLOUD_SCALE,
+    fmt="PNG",
+    fast_layout=False,
+):
+    """批量生成各章节词云。chapter_weights 为 {章节名: 词权重}；缓存未命中的章节在共享进程池
+    （RENDER_MAX_WORKERS 个进程）上并发排版。返回 (按章节顺序的 {章节名: 图片字节}, {章节名: 异常})"""
+    keys = {}
+    images = {}
+    jobs = {}
+    for name, word2weight in chapter_weights.items():
+        if not word2weight:
+            continue
+        keys[name] = _render_key(word2weight, bg_color, max_words, width, height, scale, fmt, fast_layout)
+        images[name] = _cache_get(keys[name])
+        if images[name] is None:
+            jobs[name] = (word2weight, bg_color, max_words, width, height, scale, fmt, fast_layout)
+
+    errors = {}
+    for name, data, exc in parallel.run_chapter_jobs(
+        _render_image, jobs, max_workers=RENDER_MAX_WORKERS, pool_name="wordcloud"
+    ):
+        if exc is not None:
+            errors[name] = exc
+            continue
+        images[name] = data
+        _cache_put(keys[name], data)
+    return {name: data for name, data in images.items() if data is not None}, errors
@@ -13,6 +13,8 @@ import re
 
 from matplotlib import font_manager
 
+from aid_integrated.campus.stopword_registry import get_stopwords
+
 # ===== 强制使用指定字体文件（不改任何业务功能）=====
 FONT_PATH = "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc"
 
@@ -53,18 +55,7 @@ except Exception:
 
 
 def load_stopwords():
-    stopwords_path = os.path.join(os.path.dirname(__file__), "stopwords.txt")
-    stopwords = set()
-    if os.path.exists(stopwords_path):
-        try:
-            with open(stopwords_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    word = line.strip()
-                    if word:
-                        stopwords.add(word)
-        except Exception:
-            pass
-    return stopwords
+    return get_stopwords("nlp")
 
 
 def split_paragraphs(text: str):
@@ -75,32 +66,32 @@ def split_paragraphs(text: str):
     return paras
 
 
+def _tokenize_units(units, use_jieba: bool, stopwords):
+    """逐单元分词并去停用词；jieba 可用时经共享词表在整数 id 上过滤"""
+    if not JIEBA_AVAILABLE or jieba is None:
+        for u in units:
+            yield [t for t in u.split() if t not in stopwords]
+        return
+
+    from aid_integrated.campus.doc_analysis import analyze_units
+
+    # 页面每次交互都会重跑，按内容哈希复用已有分词结果
+    analysis = analyze_units(units, tokenizer="jieba" if use_jieba else "whitespace")
+    vocab = analysis.vocab
+    is_stop = vocab.mask(stopwords)
+    for i in range(len(units)):
+        ids = analysis.unit_ids(i)
+        yield vocab.words(ids[~is_stop[ids]])
+
+
 def tokenize_for_tfidf(paragraphs, use_jieba: bool, stopwords):
-    processed = []
-    for p in paragraphs:
-        if use_jieba and JIEBA_AVAILABLE and jieba is not None:
-            tokens = jieba.lcut(p)
-        else:
-            tokens = p.split()
-        tokens = [t for t in tokens if t not in stopwords]
-        processed.append(" ".join(tokens))
-    return processed
+    return [" ".join(tokens) for tokens in _tokenize_units(paragraphs, use_jieba, stopwords)]
 
 
 def tokenize_sentences_for_w2v(text: str, use_jieba: bool, stopwords):
-    sentences = []
-    for line in text.replace("\r\n", "\n").split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-        if use_jieba and JIEBA_AVAILABLE and jieba is not None:
-            tokens = jieba.lcut(line)
-        else:
-            tokens = line.split()
-        tokens = [t for t in tokens if t not in stopwords]
-        if tokens:
-            sentences.append(tokens)
-    return sentences
+    lines = [line.strip() for line in text.replace("\r\n", "\n").split("\n")]
+    lines = [line for line in lines if line]
+    return [tokens for tokens in _tokenize_units(lines, use_jieba, stopwords) if tokens]
 
 
 def tfidf_page():
@@ -3,7 +3,7 @@ from typing import Optional
 
 import streamlit as st
 
-from aid_integrated.campus import llm_helpers, summary_utils
+from aid_integrated.campus import chapter_cache, llm_helpers, summary_utils
 
 
 @st.cache_resource(show_spinner=False)
@@ -69,6 +69,16 @@ def render() -> None:
         label_visibility="collapsed"  # 隐藏默认标题
     )
 
+    st.markdown("<h5 style='margin: 15px 0 8px 0; color: #1e40af;'>摘要方法</h5>", unsafe_allow_html=True)
+    summary_method = st.radio(
+        "",
+        ["关键句评分", "图排序 + 去冗余（适合长讲义）"],
+        index=0,
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+    summary_method = "graph" if summary_method.startswith("图排序") else "heuristic"
+
     # ========== 复选框 ==========
     use_llm_opt = st.checkbox("使用 DeepSeek 优化表达（可选）", value=True)
     helpers = _load_optional_llm_helpers_cached() if use_llm_opt else None
@@ -100,39 +110,6 @@ def render() -> None:
                 return []
         return []
 
-    def _extract_core(sentences: list[str]) -> list[str]:
-        if not sentences:
-            return []
-        scores = summary_utils.score_sentences(sentences)
-        filtered: list[str] = []
-        for s in sentences:
-            s2 = str(s).strip()
-            if not s2:
-                continue
-            english_chars = sum(1 for c in s2 if ("a" <= c <= "z") or ("A" <= c <= "Z"))
-            ratio = english_chars / len(s2) if len(s2) else 0
-            if ratio <= 0.3:
-                filtered.append(s2)
-
-        if not filtered:
-            return []
-
-        ranked = sorted(filtered, key=lambda x: scores[sentences.index(x)], reverse=True)
-        import re
-
-        seen = set()
-        out: list[str] = []
-        for s in ranked:
-            norm = re.sub(r"[^\w\s]", "", s).strip().lower()
-            if norm and norm not in seen:
-                seen.add(norm)
-                out.append(s)
-            if len(out) >= 10:
-                break
-
-        out.sort(key=lambda x: sentences.index(x))
-        return out
-
     def _render_core_box(lines: list[str], title: str) -> None:
         if not lines:
             st.info("暂无有效核心知识点")
@@ -175,10 +152,10 @@ def render() -> None:
                     if not sents:
                         continue
 
-                    summary = summary_utils.generate_summary(sents, summary_length)
+                    # 章节内容与参数未变时直接复用缓存的摘要与核心句
+                    summary, raw_core = chapter_cache.chapter_summary(sents, summary_length, summary_method)
                     summary2 = _optimize_summary(summary)
 
-                    raw_core = _extract_core(sents)
                     core2 = _optimize_core(raw_core)
                     sug = _suggestions(summary2, core2)
 
@@ -191,11 +168,18 @@ def render() -> None:
 
         elif generate_mode == "全局生成（所有文件合并）" and st.session_state.get("sentences"):
             with st.spinner("正在处理全局内容..."):
-                sents = st.session_state["sentences"]
-                summary = summary_utils.generate_summary(sents, summary_length)
+                chapter_sentences = st.session_state.get("chapter_sentences")
+                if chapter_sentences:
+                    # 由各章节缓存的统计合并，只有新增或重新清洗的章节需要重新统计
+                    summary, raw_core = chapter_cache.global_summary(
+                        list(chapter_sentences.values()), summary_length, summary_method
+                    )
+                else:
+                    sents = st.session_state["sentences"]
+                    summary = summary_utils.generate_summary(sents, summary_length, method=summary_method)
+                    raw_core = summary_utils.extract_core_sentences(sents)
                 summary2 = _optimize_summary(summary)
 
-                raw_core = _extract_core(sents)
                 core2 = _optimize_core(raw_core)
                 sug = _suggestions(summary2, core2)
 
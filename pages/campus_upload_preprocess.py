@@ -1,13 +1,39 @@
 import streamlit as st
 from io import BytesIO
 
-from aid_integrated.campus import file_utils, text_cleaner
+from aid_integrated.campus import blob_store, file_utils, ingest, packed_text, parse_cache
 
 
-def _load_from_bytes(name: str, data: bytes) -> str:
+def _load_from_bytes(name: str, data: bytes, progress=None, digest=None) -> str:
+    return parse_cache.load_file_cached(name, data, progress=progress, digest=digest)
+
+
+def _preview_from_bytes(name: str, data: bytes, limit: int = 1500) -> str:
     buf = BytesIO(data)
     buf.name = name
-    return file_utils.load_file(buf)
+    preview, truncated = file_utils.read_preview(buf, limit)
+    return preview + ("..." if truncated else "")
+
+
+def _run_chapters_with_progress(action: str, fn, jobs: dict) -> dict:
+    """并发处理多个章节并逐章节显示状态；返回成功章节的 {章节名: 结果}，失败章节单独报错"""
+    results: dict = {}
+    if not jobs:
+        return results
+    total = len(jobs)
+    bar = st.progress(0.0, text=f"正在{action}章节：0/{total}")
+    rows = {name: st.empty() for name in jobs}
+    for name, row in rows.items():
+        row.caption(f"⏳ {name}：排队中")
+    for done, (name, result, error) in enumerate(ingest.run_chapter_jobs(fn, jobs), 1):
+        if error is None:
+            results[name] = result
+            rows[name].empty()
+        else:
+            rows[name].error(f"{action}失败：{name}：{error}")
+        bar.progress(done / total, text=f"正在{action}章节：{done}/{total}（最近完成：{name}）")
+    bar.empty()
+    return results
 
 
 def render() -> None:
@@ -37,8 +63,15 @@ def render() -> None:
         unsafe_allow_html=True,
     )
 
-    if "campus_uploaded_files_bytes" not in st.session_state:
-        st.session_state["campus_uploaded_files_bytes"] = {}
+    blob_store.sweep_idle()
+    store = st.session_state.get("campus_blob_store")
+    if store is None or store.closed:
+        if store is not None:
+            st.info("上传的文件因长时间未操作已释放，已解析的文本仍保留；如需重新解析请重新上传。")
+        store = blob_store.SessionBlobStore()
+        st.session_state["campus_blob_store"] = store
+        st.session_state["campus_uploaded_files"] = {}
+    st.session_state.setdefault("campus_uploaded_files", {})
 
     c1, c2 = st.columns([1, 1])
     with c2:
@@ -48,7 +81,8 @@ def render() -> None:
             type="secondary",
             help="清空后需重新上传文件"
         ):
-            st.session_state["campus_uploaded_files_bytes"] = {}
+            store.clear()
+            st.session_state["campus_uploaded_files"] = {}
             st.session_state["chapter_raw_texts"] = {}
             st.session_state["chapter_clean_texts"] = {}
             st.session_state["chapter_sentences"] = {}
@@ -74,28 +108,67 @@ def render() -> None:
     if uploaded_files:
         for f in uploaded_files:
             try:
-                st.session_state["campus_uploaded_files_bytes"][f.name] = f.getvalue()
+                st.session_state["campus_uploaded_files"][f.name] = store.put(f.name, f.getvalue())
             except Exception as e:
                 st.error(f"缓存文件失败：{f.name}：{e}")
 
-    cached_bytes = st.session_state.get("campus_uploaded_files_bytes", {})
-    if cached_bytes:
+    cached_files = st.session_state.get("campus_uploaded_files", {})
+    if cached_files or st.session_state.get("chapter_raw_texts"):
         if not st.session_state.get("chapter_raw_texts"):
             st.session_state["chapter_raw_texts"] = {}
-            global_raw_text = ""
-            for name, data in cached_bytes.items():
+            loaded: dict = {}
+            misses: dict = {}
+            for name, handle in cached_files.items():
+                digest = store.info(handle).sha256
+                raw_text = parse_cache.lookup(name, digest=digest)
+                if raw_text is None:
+                    misses[name] = (handle, digest)
+                else:
+                    loaded[name] = raw_text
+
+            if len(misses) == 1:
+                name, (handle, digest) = next(iter(misses.items()))
+                data = store.read(handle)
+                # 未命中缓存：先解码开头几页/几段给出预览，完整解析期间可先浏览
+                preview_box = st.empty()
+                with preview_box.container():
+                    st.caption(f"正在解析 {name}，先预览开头部分：")
+                    st.text_area(
+                        label=f"原始文本预览 - {name}",
+                        value=_preview_from_bytes(name, data),
+                        height=200,
+                        disabled=True,
+                        label_visibility="collapsed"
+                    )
+                bar = st.progress(0.0, text=f"正在读取文件：{name}...")
+
+                def _on_page(done: int, total: int) -> None:
+                    bar.progress(done / max(total, 1), text=f"正在读取文件：{name}（{done}/{total} 页）")
+
                 with st.spinner(f"正在读取文件：{name}..."):
                     try:
-                        raw_text = _load_from_bytes(name, data)
+                        loaded[name] = _load_from_bytes(name, data, progress=_on_page, digest=digest)
                     except Exception as e:
                         st.error(f"读取文件失败：{name}：{e}")
-                        continue
+                    finally:
+                        bar.empty()
+                        preview_box.empty()
+            elif misses:
+                jobs = {name: (store.read(handle), digest) for name, (handle, digest) in misses.items()}
+                loaded.update(_run_chapters_with_progress("读取", ingest.parse_chapter, jobs))
+                del jobs
+
+            global_raw_text = ""
+            for name in cached_files:
+                if name not in loaded:
+                    continue
+                raw_text = loaded[name]
                 st.session_state["chapter_raw_texts"][name] = raw_text
                 global_raw_text += raw_text + "\n\n"
             st.session_state["raw_text"] = global_raw_text
 
         st.markdown(
-            f"<div style='background:#e8f5e9; padding:10px; border-radius:8px; color:#2e7d32; margin:10px 0;'>✅ 已缓存 {len(cached_bytes)} 个文件：切换页面后不会丢失。</div>",
+            f"<div style='background:#e8f5e9; padding:10px; border-radius:8px; color:#2e7d32; margin:10px 0;'>✅ 已缓存 {len(cached_files or st.session_state['chapter_raw_texts'])} 个文件：切换页面后不会丢失。</div>",
             unsafe_allow_html=True
         )
 
@@ -137,27 +210,42 @@ def render() -> None:
             global_clean_text = ""
             global_sentences = []
 
-            with st.spinner("正在清洗所有章节文本..."):
-                for file_name, raw_text in st.session_state.get("chapter_raw_texts", {}).items():
-                    try:
-                        cleaned_text, sentences = text_cleaner.process_text_cleaning(
-                            raw_text,
-                            lower_case=lower_case,
-                            remove_formula=remove_formula,
-                            num_process=num_process,
-                            remove_stopwords=remove_stopwords,
-                        )
-                    except Exception as e:
-                        st.error(f"清洗失败：{file_name}：{e}")
-                        continue
+            options = {
+                "lower_case": lower_case,
+                "remove_formula": remove_formula,
+                "num_process": num_process,
+                "remove_stopwords": remove_stopwords,
+            }
+            chapter_raw_texts = st.session_state.get("chapter_raw_texts", {})
+            jobs = {}
+            for file_name, raw_text in chapter_raw_texts.items():
+                handle = cached_files.get(file_name)
+                if file_name.lower().endswith(".csv") and handle is not None and not store.closed:
+                    # CSV 直接从原文件分块流式清洗，不再把整份原始文本传给工作进程
+                    jobs[file_name] = (None, options, store.read(handle))
+                else:
+                    jobs[file_name] = (raw_text, options)
+            cleaned = _run_chapters_with_progress("清洗", ingest.clean_chapter, jobs)
 
-                    st.session_state["chapter_clean_texts"][file_name] = cleaned_text
-                    st.session_state["chapter_sentences"][file_name] = sentences
-                    global_clean_text += cleaned_text + "\n\n"
-                    global_sentences.extend(sentences)
+            sentence_counts = {}
+            for file_name in chapter_raw_texts:
+                if file_name not in cleaned:
+                    continue
+                cleaned_text, sentences = cleaned[file_name]
+                st.session_state["chapter_clean_texts"][file_name] = cleaned_text
+                sentence_counts[file_name] = len(sentences)
+                global_clean_text += cleaned_text + "\n\n"
+                global_sentences.extend(sentences)
 
+            # 所有章节的句子只打包成一段连续缓冲区 + 边界数组，各章节保存其切片视图（共用缓冲区），展示时才切出单句
+            packed_sentences = packed_text.pack(global_sentences)
+            start = 0
+            for file_name, count in sentence_counts.items():
+                st.session_state["chapter_sentences"][file_name] = packed_sentences[start : start + count]
+                start += count
+            del global_sentences
             st.session_state["clean_text"] = global_clean_text
-            st.session_state["sentences"] = global_sentences
+            st.session_state["sentences"] = packed_sentences
 
             st.markdown(
                 f"<div style='background:#e8f5e9; padding:10px; border-radius:8px; color:#2e7d32; margin:15px 0;'>✅ 文本清洗完成：共处理 {len(st.session_state['chapter_clean_texts'])} 个章节</div>",
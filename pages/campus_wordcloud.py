@@ -1,13 +1,6 @@
 import streamlit as st
-from io import BytesIO
 
-from aid_integrated.campus import wordcloud_utils
-
-
-def _fig_to_png_bytes(fig) -> bytes:
-    buf = BytesIO()
-    fig.savefig(buf, format="png", dpi=180, bbox_inches="tight")
-    return buf.getvalue()
+from aid_integrated.campus import chapter_cache, wordcloud_utils
 
 
 def render() -> None:
@@ -58,48 +51,74 @@ def render() -> None:
     with col3:
         max_words = st.slider("最大词数", 50, 500, 200, 50)
 
+    fast_layout = st.checkbox(
+        "快速排版",
+        value=int(max_words) > 200,
+        help="在降采样网格上排版，词数较多时明显更快，版面效果基本一致",
+    )
+
+    corpus_idf = False
+    if generate_mode == "按章节生成（每个文件一张词云）" and weight_method == "TF-IDF":
+        corpus_idf = st.checkbox(
+            "跨章节统一计算 IDF",
+            value=True,
+            help="所有章节一次拟合，IDF 按章节计算，更能突出各章节独有的词；关闭则每个章节单独计算",
+        )
+
     if st.button("生成智能词云", type="primary", width="stretch"):
         results: dict = {
             "generate_mode": generate_mode,
             "weight_method": weight_method,
             "bg_color": bg_color,
             "max_words": int(max_words),
+            "corpus_idf": corpus_idf,
+            "fast_layout": fast_layout,
             "chapter": {},
             "global": None,
         }
         if generate_mode == "按章节生成（每个文件一张词云）" and has_chapter_data:
             with st.spinner("正在为每个章节生成词云..."):
-                for idx, (file_name, cleaned_text) in enumerate(st.session_state["chapter_clean_texts"].items(), 1):
+                chapter_clean_texts = st.session_state["chapter_clean_texts"]
+                # 各章节权重按内容缓存，只有新增或重新清洗的章节需要重新计算
+                all_weights = chapter_cache.chapter_wordcloud_weights(chapter_clean_texts, weight_method, corpus_idf)
+                chapter_weights = {}
+                for idx, (file_name, cleaned_text) in enumerate(chapter_clean_texts.items(), 1):
                     if not str(cleaned_text).strip():
                         st.warning(f"章节 {idx}：{file_name} 无有效文本，跳过！")
                         continue
 
-                    if weight_method == "TF-IDF":
-                        word2weight = wordcloud_utils.get_tfidf_weights(cleaned_text)
-                    else:
-                        word2weight = wordcloud_utils.get_textrank_weights(cleaned_text)
-
+                    word2weight = all_weights.get(file_name, {})
                     if not word2weight:
                         st.warning(f"章节 {idx}：{file_name} 无有效词汇生成词云！")
                         continue
+                    chapter_weights[file_name] = word2weight
 
-                    fig = wordcloud_utils.generate_weighted_wordcloud(word2weight, bg_color, max_words)
-                    results["chapter"][file_name] = _fig_to_png_bytes(fig)
+                # 各章节词云在进程池上并发排版，结果按章节顺序返回
+                images, errors = wordcloud_utils.render_wordcloud_images(
+                    chapter_weights, bg_color, max_words, fast_layout=fast_layout
+                )
+                results["chapter"] = images
+                for file_name, e in errors.items():
+                    st.error(f"{file_name} 词云生成失败：{str(e)}")
 
         elif generate_mode == "全局生成（所有文件合并）" and has_global_data:
             with st.spinner("正在生成全局词云..."):
-                clean_text = st.session_state["clean_text"]
-                if weight_method == "TF-IDF":
-                    word2weight = wordcloud_utils.get_tfidf_weights(clean_text)
+                chapter_clean_texts = st.session_state.get("chapter_clean_texts")
+                if chapter_clean_texts:
+                    # 由各章节缓存的词流拼接计算，与对合并文本整体计算的结果一致
+                    word2weight = chapter_cache.global_wordcloud_weights(chapter_clean_texts, weight_method)
+                elif weight_method == "TF-IDF":
+                    word2weight = wordcloud_utils.get_tfidf_weights(st.session_state["clean_text"])
                 else:
-                    word2weight = wordcloud_utils.get_textrank_weights(clean_text)
+                    word2weight = wordcloud_utils.get_textrank_weights(st.session_state["clean_text"])
 
                 if not word2weight:
                     st.warning("无有效词汇生成词云！")
                     return
 
-                fig = wordcloud_utils.generate_weighted_wordcloud(word2weight, bg_color, max_words)
-                results["global"] = _fig_to_png_bytes(fig)
+                results["global"] = wordcloud_utils.render_wordcloud_image(
+                    word2weight, bg_color, max_words, fast_layout=fast_layout
+                )
 
         st.session_state["campus_wordcloud_results"] = results
 
@@ -109,7 +128,7 @@ def render() -> None:
         st.subheader("📌 生成结果（已缓存）")
         if results.get("generate_mode"):
             st.caption(
-                f"模式：{results.get('generate_mode')}｜权重模型：{results.get('weight_method')}｜背景：{results.get('bg_color')}｜最大词数：{results.get('max_words')}"
+                f"模式：{results.get('generate_mode')}｜权重模型：{results.get('weight_method')}{'（跨章节 IDF）' if results.get('corpus_idf') else ''}｜背景：{results.get('bg_color')}｜最大词数：{results.get('max_words')}"
             )
 
         if results.get("chapter"):
@@ -0,0 +1,37 @@
+"""摘要与章节梳理的回归检查
+
+用法：python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from aid_integrated.campus import chapter_cache, summary_utils  # noqa: E402
+
+
+def test_graph_summary_without_terms():
+    # 去停用词与单字后没有任何词时，图排序退回关键句评分而不是报错
+    sentences = ["的的的的的的。"]
+    assert summary_utils.generate_summary(sentences, method="graph") == "本课程核心内容为：的的的的的的。"
+    summary, _ = chapter_cache.chapter_summary(sentences, method="graph")
+    assert summary == "本课程核心内容为：的的的的的的。"
+
+
+def test_decimal_sentences_are_not_headings():
+    # 以小数开头的正文句（3.14、2.5万、1.5倍）不能被识别为编号小节
+    outline = summary_utils.extract_chapter_full_sentences("第一章 圆。3.14是圆周率的近似值。2.5万名学生参加考试。1.5倍的速度。")
+    assert "第一章：" in outline
+    assert all(f"{num}：" not in outline for num in ("3.14", "2.5", "1.5"))
+
+
+def test_numbered_headings_follow_chapter():
+    index = summary_utils.build_chapter_index(["第二章 方法。", "2.1数据集合。", "正文内容较长的句子。", "2.2实验设置。"])
+    assert [entry[0] for entry in index] == ["第二章", "2.1", "2.2"]
+
+
+def test_decimal_sentences_without_chapter():
+    # 没有章级标题时，以小数开头的句子同样不算小节
+    outline = summary_utils.extract_chapter_full_sentences("3.14是圆周率的近似值。2.5万名学生参加考试。1.5倍的速度。")
+    assert outline == "未检测到章节结构标志"
+    assert summary_utils.build_chapter_index(["3.14是圆周率的近似值。", "1.1绪论部分。"]) == []